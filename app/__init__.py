@@ -1,17 +1,46 @@
+import os
+import time
+
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from .models import db  # ✅ usa a instância correta
+from .banco import ativar_lazyload_estrito, configurar_engine
 
 def create_app():
+    inicio = time.perf_counter()
+
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    # 🔹 atrás do proxy reverso: request.remote_addr passa a ser o IP
+    #    do cliente (usado nos limites de tentativas)
+    if app.config['PROXIES_CONFIAVEIS']:
+        proxies = app.config['PROXIES_CONFIAVEIS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+
     # ✅ registra o app no SQLAlchemy correto
     db.init_app(app)
 
-    # 🔹 cria tabelas automaticamente (apenas DEV)
+    # 🔹 pool, timeouts e PRAGMAs conforme o banco
     with app.app_context():
-        db.create_all()
+        configurar_engine(app, db)
+
+    if app.config['LAZYLOAD_ESTRITO']:
+        ativar_lazyload_estrito(db)
+
+    # 🔹 o schema NÃO é verificado aqui: use `flask db-init`
+    #    (ou `python run.py` em DEV), assim os workers sobem sem DDL
+    from .comandos import registrar_comandos
+    registrar_comandos(app)
+
+    # 🔹 templates compilados em disco: workers novos não recompilam
+    if app.config['JINJA_CACHE_DIR']:
+        os.makedirs(app.config['JINJA_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(
+            app.config['JINJA_CACHE_DIR']
+        )
 
     # 🔹 blueprints
     from .routes import main
@@ -20,4 +49,25 @@ def create_app():
     app.register_blueprint(main)
     app.register_blueprint(auth)
 
+    # 🔹 arquivos estáticos com hash (após `flask assets-build`)
+    from .assets import iniciar_assets
+    iniciar_assets(app)
+
+    # 🔹 gzip/brotli nas respostas HTML e JSON maiores
+    from .compressao import iniciar_compressao
+    iniciar_compressao(app)
+
+    # 🔹 métricas (opcional, METRICS_ENABLED)
+    from .metricas import iniciar_metricas
+    iniciar_metricas(app, db)
+
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if duracao_ms > app.config['STARTUP_BUDGET_MS']:
+        app.logger.warning(
+            'App pronto em %.0f ms (acima do limite de %s ms)',
+            duracao_ms, app.config['STARTUP_BUDGET_MS']
+        )
+    else:
+        app.logger.info('App pronto em %.0f ms', duracao_ms)
+
     return app
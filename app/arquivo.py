@@ -0,0 +1,150 @@
+"""
+Arquivamento dos agendamentos de meses passados.
+
+A tabela agendamento guarda só o período em uso: do mês de
+ARQUIVO_MESES meses atrás em diante. Os anteriores vão para
+agendamento_arquivo por um job periódico (ex: cron diário):
+
+    flask agendamentos-arquivar
+
+No Postgres o arquivo é particionado por mês; as partições são criadas
+aqui, já compactas (fillfactor 100, a tabela só recebe INSERTs) e,
+com ARQUIVO_TABLESPACE, num tablespace próprio (ex: volume com
+compressão). No SQLite é uma única tabela WITHOUT ROWID.
+
+Nada de hoje em diante é arquivado, então só as leituras de períodos
+passados (relatório, histórico do cliente, admin, exportação) juntam as
+duas tabelas.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import delete, insert, select, text, union_all
+
+from config import Config
+from .models import db, Agendamento, AgendamentoArquivo, OcupacaoDia
+
+# agendamentos movidos por transação
+LOTE_ARQUIVO = 1000
+
+COLUNAS = [coluna.name for coluna in AgendamentoArquivo.__table__.columns]
+
+
+# =========================
+# PERÍODO ATIVO
+# =========================
+def inicio_periodo_ativo(hoje=None, meses=None):
+    """Primeiro dia do mês mais antigo mantido em agendamento."""
+    hoje = hoje or datetime.now().date()
+    meses = Config.ARQUIVO_MESES if meses is None else meses
+
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def inclui_arquivo(inicio):
+    """Se um período a partir de `inicio` (None: desde sempre) pode ter arquivados."""
+    return inicio is None or inicio < datetime.now().date()
+
+
+def com_arquivo(consulta, inicio=None):
+    """
+    `consulta(tabela)` monta o SELECT para uma das tabelas; devolve o
+    de agendamento ou, se o período passa pelo arquivo, o UNION ALL
+    das duas (use como subquery para agrupar/ordenar).
+    """
+    selects = [consulta(Agendamento.__table__)]
+    if inclui_arquivo(inicio):
+        selects.append(consulta(AgendamentoArquivo.__table__))
+
+    return union_all(*selects) if len(selects) > 1 else selects[0]
+
+
+def modelos_periodo(inicio):
+    """Modelos a consultar (ORM) para um período a partir de `inicio`."""
+    if inclui_arquivo(inicio):
+        return (Agendamento, AgendamentoArquivo)
+    return (Agendamento,)
+
+
+# =========================
+# ARQUIVAMENTO (flask agendamentos-arquivar)
+# =========================
+def _proximo_mes(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _criar_particoes(conn, meses):
+    """Partições mensais do arquivo no Postgres (idempotente)."""
+    tabela = AgendamentoArquivo.__tablename__
+    espaco = (
+        f' TABLESPACE {Config.ARQUIVO_TABLESPACE}'
+        if Config.ARQUIVO_TABLESPACE else ''
+    )
+
+    for mes in sorted(meses):
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS {tabela}_{mes:%Y_%m} '
+            f'PARTITION OF {tabela} '
+            f"FOR VALUES FROM ('{mes.isoformat()}') "
+            f"TO ('{_proximo_mes(mes).isoformat()}') "
+            f'WITH (fillfactor = 100){espaco}'
+        ))
+
+
+def arquivar_agendamentos(antes_de=None, lote=LOTE_ARQUIVO):
+    """
+    Move para agendamento_arquivo os agendamentos anteriores a
+    `antes_de` (padrão: inicio_periodo_ativo(); no máximo o início do
+    mês atual), em lotes pela chave primária e com um commit por lote.
+    O DELETE ... RETURNING define o que é copiado: um agendamento
+    cancelado durante o job não reaparece no arquivo. Descarta também
+    o resumo ocupacao_dia desses dias. Retorna quantos agendamentos moveu.
+    """
+    # nunca o mês atual: as leituras de hoje em diante ignoram o arquivo
+    antes_de = min(
+        antes_de or inicio_periodo_ativo(), inicio_periodo_ativo(meses=0)
+    )
+    postgres = db.engine.dialect.name == 'postgresql'
+
+    agendamento = Agendamento.__table__
+    arquivo = AgendamentoArquivo.__table__
+    ultimo_id = 0
+    movidos = 0
+
+    while True:
+        with db.engine.begin() as conn:
+            ids = conn.execute(
+                select(agendamento.c.id).where(
+                    agendamento.c.data < antes_de,
+                    agendamento.c.id > ultimo_id
+                ).order_by(agendamento.c.id).limit(lote)
+            ).scalars().all()
+
+            if not ids:
+                break
+
+            linhas = conn.execute(
+                delete(agendamento).where(
+                    agendamento.c.id.in_(ids)
+                ).returning(*(agendamento.c[nome] for nome in COLUNAS))
+            ).mappings().all()
+
+            if linhas:
+                if postgres:
+                    _criar_particoes(conn, {
+                        linha['data'].replace(day=1) for linha in linhas
+                    })
+                conn.execute(insert(arquivo), [dict(linha) for linha in linhas])
+
+        movidos += len(linhas)
+        ultimo_id = ids[-1]
+
+    # o resumo só é lido de hoje em diante
+    with db.engine.begin() as conn:
+        conn.execute(
+            delete(OcupacaoDia.__table__).where(
+                OcupacaoDia.__table__.c.data < antes_de
+            )
+        )
+
+    return movidos
@@ -0,0 +1,188 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+# saída do build, dentro de app/static
+DIST = 'dist'
+MANIFESTO = 'manifest.json'
+
+# arquivos de cada build ainda mantidos em dist/ (o mais novo por último)
+HISTORICO = 'builds.json'
+
+# builds anteriores preservados: HTML em cache (ex: a vitrine) e workers
+# ainda com o manifesto antigo continuam achando os seus arquivos
+BUILDS_MANTIDOS = 3
+
+# extensões pré-comprimidas (gzip sempre, brotli se instalado)
+COMPRIMIVEIS = ('.css', '.js', '.svg', '.json', '.txt')
+
+# arquivos com hash no nome nunca mudam de conteúdo
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+
+
+# =========================
+# BUILD (flask assets-build)
+# =========================
+def _nome_com_hash(relativo, conteudo):
+    raiz, extensao = os.path.splitext(relativo)
+    return f'{raiz}.{hashlib.sha256(conteudo).hexdigest()[:10]}{extensao}'
+
+
+def _gravar(pasta_dist, relativo, conteudo):
+    destino = os.path.join(pasta_dist, relativo)
+    # já gerado por um build anterior (o nome vem do conteúdo): não
+    # regrava um arquivo que pode estar sendo servido
+    if os.path.exists(destino):
+        return destino
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    return destino
+
+
+def _comprimir(destino, conteudo):
+    if not os.path.exists(destino + '.gz'):
+        with open(destino + '.gz', 'wb') as arquivo:
+            arquivo.write(gzip.compress(conteudo, compresslevel=9))
+
+    try:
+        import brotli  # opcional
+    except ImportError:
+        return
+
+    if not os.path.exists(destino + '.br'):
+        with open(destino + '.br', 'wb') as arquivo:
+            arquivo.write(brotli.compress(conteudo))
+
+
+def _ler_json(caminho, padrao):
+    if not os.path.exists(caminho):
+        return padrao
+    with open(caminho) as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_json(caminho, dados):
+    # troca atômica: um worker subindo nunca lê o arquivo pela metade
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w') as arquivo:
+        json.dump(dados, arquivo, indent=2, sort_keys=True)
+    os.replace(temporario, caminho)
+
+
+def _podar(pasta_dist, historico):
+    """Remove de dist/ o que nenhum dos builds em `historico` usa."""
+    usados = {MANIFESTO, HISTORICO}
+    for gerados in historico:
+        for gerado in gerados:
+            relativo = gerado[len(DIST) + 1:]
+            usados.update((relativo, relativo + '.gz', relativo + '.br'))
+
+    for raiz, pastas, arquivos in os.walk(pasta_dist, topdown=False):
+        for nome in arquivos:
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.relpath(caminho, pasta_dist).replace(os.sep, '/')
+            if relativo not in usados:
+                os.remove(caminho)
+
+        if raiz != pasta_dist and not os.listdir(raiz):
+            os.rmdir(raiz)
+
+
+def construir(pasta_static, mantidos=BUILDS_MANTIDOS):
+    """
+    Gera app/static/dist/ com nomes por conteúdo e versões comprimidas,
+    e grava o manifesto {original: gerado}. Os arquivos dos `mantidos`
+    builds mais recentes (este incluído) ficam; os demais são removidos.
+    """
+    pasta_dist = os.path.join(pasta_static, DIST)
+    os.makedirs(pasta_dist, exist_ok=True)
+
+    # dist/ de antes do histórico: o manifesto atual conta como um build
+    anterior = _ler_json(os.path.join(pasta_dist, MANIFESTO), {'arquivos': {}})
+    historico = _ler_json(
+        os.path.join(pasta_dist, HISTORICO),
+        [sorted(anterior['arquivos'].values())]
+    )
+
+    manifesto = {'arquivos': {}}
+
+    for raiz, pastas, arquivos in os.walk(pasta_static):
+        if os.path.abspath(raiz) == os.path.abspath(pasta_static):
+            pastas[:] = [p for p in pastas if p != DIST]
+
+        for nome in sorted(arquivos):
+            caminho = os.path.join(raiz, nome)
+            relativo = os.path.relpath(caminho, pasta_static).replace(os.sep, '/')
+
+            with open(caminho, 'rb') as arquivo:
+                conteudo = arquivo.read()
+
+            gerado = _nome_com_hash(relativo, conteudo)
+            destino = _gravar(pasta_dist, gerado, conteudo)
+            manifesto['arquivos'][relativo] = f'{DIST}/{gerado}'
+
+            if os.path.splitext(nome)[1].lower() in COMPRIMIVEIS:
+                _comprimir(destino, conteudo)
+
+    historico = (historico + [sorted(manifesto['arquivos'].values())])[-mantidos:]
+
+    _gravar_json(os.path.join(pasta_dist, MANIFESTO), manifesto)
+    _gravar_json(os.path.join(pasta_dist, HISTORICO), historico)
+    _podar(pasta_dist, historico)
+
+    return manifesto
+
+
+# =========================
+# USO NO APP
+# =========================
+def iniciar_assets(app):
+    """
+    Com o manifesto presente, url_for('static', filename=...) aponta
+    para o arquivo com hash, servido com cache imutável e, quando o
+    navegador aceita, na versão pré-comprimida. Sem build, nada muda.
+    """
+    pasta_static = app.static_folder
+    caminho = os.path.join(pasta_static, DIST, MANIFESTO)
+
+    arquivos = {}
+    if os.path.exists(caminho):
+        with open(caminho) as arquivo:
+            arquivos = json.load(arquivo)['arquivos']
+
+    @app.url_defaults
+    def _arquivo_com_hash(endpoint, valores):
+        if endpoint == 'static' and valores.get('filename') in arquivos:
+            valores['filename'] = arquivos[valores['filename']]
+
+    def servir_static(filename):
+        if not filename.startswith(DIST + '/'):
+            return app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        resposta = None
+
+        for codificacao, sufixo in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[codificacao] and os.path.exists(
+                os.path.join(pasta_static, filename + sufixo)
+            ):
+                resposta = send_from_directory(
+                    pasta_static, filename + sufixo, mimetype=mimetype
+                )
+                resposta.headers['Content-Encoding'] = codificacao
+                break
+
+        if resposta is None:
+            resposta = send_from_directory(pasta_static, filename)
+
+        resposta.headers['Cache-Control'] = CACHE_IMUTAVEL
+        resposta.vary.add('Accept-Encoding')
+        return resposta
+
+    app.view_functions['static'] = servir_static
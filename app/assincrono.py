@@ -0,0 +1,348 @@
+"""
+Disponibilidade pública em ASGI, com o engine asyncio do SQLAlchemy.
+
+Atende as rotas somente-leitura mais acessadas do funil sem prender uma
+thread por requisição durante a ida ao banco:
+
+    POST /verificar_horarios
+    GET  /disponibilidade/<servico_id>?de=AAAA-MM-DD&ate=AAAA-MM-DD
+    GET  /disponibilidade/<servico_id>/proximo?de=AAAA-MM-DD
+
+As respostas são as mesmas das rotas Flask (o cálculo e a validação são
+os de disponibilidade.py). As demais rotas, inclusive todas as
+gravações, continuam no app Flask; o proxy encaminha só esses caminhos
+para cá (qualquer outro recebe 404):
+
+    uvicorn app.assincrono:app --workers 2
+
+Requer um servidor ASGI e o driver assíncrono do banco, aiosqlite
+(SQLite) ou asyncpg (Postgres): pip install -r requirements-asgi.txt
+
+Os horários segurados pelo próprio cliente (session['reserva'], gravada
+por /confirmar_agendamento) continuam aparecendo para ele: o token vem do
+cookie de sessão do Flask, conferido com a mesma SECRET_KEY.
+
+A agenda (configuração e exceções) só vem do cache com CACHE_URL: é o
+mesmo Redis em que o app Flask invalida ao salvar a agenda, lido pelo
+cliente assíncrono. Sem CACHE_URL ela é lida do banco a cada consulta,
+já que um cache em memória deste processo ficaria desatualizado.
+"""
+import json
+import re
+from datetime import datetime, timedelta
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import parse_qs
+
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import Config
+from .disponibilidade import (
+    MAX_DIAS_PERIODO, agrupar_ocupacao, calcular_periodo, consulta_ocupacao,
+    dados_verificacao, montar_agenda, periodo_consulta, primeiro_dia_livre
+)
+from .cache import criar_cache_assincrono
+from .models import ConfiguracaoAgenda, ExcecaoAgenda, Servico
+
+
+# =========================
+# ENGINE ASSÍNCRONO
+# =========================
+def url_assincrona(url):
+    """Troca o driver da DATABASE_URL pelo equivalente assíncrono."""
+    esquema, resto = url.split('://', 1)
+
+    if esquema.startswith('sqlite'):
+        return f'sqlite+aiosqlite://{resto}'
+    if esquema in ('postgresql', 'postgresql+psycopg2'):
+        return f'postgresql+asyncpg://{resto}'
+
+    return url
+
+
+def criar_engine():
+    url = Config.ASYNC_DATABASE_URL or url_assincrona(Config.SQLALCHEMY_DATABASE_URI)
+
+    # mesmo perfil do app síncrono; no asyncpg o timeout vai por
+    # server_settings em vez da opção de linha de comando do psycopg2
+    opcoes = dict(Config.SQLALCHEMY_ENGINE_OPTIONS)
+
+    if url.startswith('postgresql+asyncpg'):
+        opcoes['connect_args'] = {
+            'server_settings': {
+                'statement_timeout': str(Config.DB_STATEMENT_TIMEOUT_MS),
+            },
+        }
+
+    return create_async_engine(url, **opcoes)
+
+
+# =========================
+# CONSULTAS
+# =========================
+async def _servico(conn, servico_id):
+    return (await conn.execute(
+        select(Servico.usuario_id, Servico.duracao_minutos).where(
+            Servico.id == servico_id
+        )
+    )).first()
+
+
+async def _agenda(conn, cache, usuario_id):
+    # mesmas chaves do cache_agenda do app Flask (ver disponibilidade.py)
+    if cache is not None:
+        agenda = await cache.get(usuario_id)
+        if agenda is not None:
+            return agenda
+
+    config = (await conn.execute(
+        select(
+            ConfiguracaoAgenda.dias_semana,
+            ConfiguracaoAgenda.horarios_base
+        ).where(ConfiguracaoAgenda.usuario_id == usuario_id)
+    )).first()
+
+    excecoes = []
+    if config:
+        excecoes = (await conn.execute(
+            select(
+                ExcecaoAgenda.data,
+                ExcecaoAgenda.dia_ativo,
+                ExcecaoAgenda.horarios_bloqueados
+            ).where(ExcecaoAgenda.usuario_id == usuario_id)
+        )).all()
+
+    agenda = montar_agenda(config, excecoes)
+    if cache is not None:
+        await cache.set(usuario_id, agenda)
+    return agenda
+
+
+async def livres_periodo(engine, servico_id, inicio, fim, cache=None, reserva=None):
+    """None se o serviço não existir; senão {data: [horários]}."""
+    async with engine.connect() as conn:
+        servico = await _servico(conn, servico_id)
+        if servico is None:
+            return None
+
+        agenda = await _agenda(conn, cache, servico.usuario_id)
+
+        ocupacao = {}
+        if agenda['configurada']:
+            # resumo por dia e horários segurados em /confirmar_agendamento
+            ocupacao = agrupar_ocupacao(await conn.execute(consulta_ocupacao(
+                servico.usuario_id, inicio, fim, datetime.utcnow(), reserva
+            )), agenda['passo'])
+
+    return calcular_periodo(agenda, ocupacao, inicio, fim, servico.duracao_minutos)
+
+
+async def proximo_livre(engine, servico_id, a_partir, cache=None):
+    """None se o serviço não existir; senão (data ou None, [horários])."""
+    async with engine.connect() as conn:
+        servico = await _servico(conn, servico_id)
+        if servico is None:
+            return None
+
+        agenda = await _agenda(conn, cache, servico.usuario_id)
+        if not agenda['configurada']:
+            return None, []
+
+        # mesmo período de disponibilidade.proximo_dia_livre()
+        fim = a_partir + timedelta(days=MAX_DIAS_PERIODO - 1)
+        linhas = (await conn.execute(consulta_ocupacao(
+            servico.usuario_id, a_partir, fim, datetime.utcnow()
+        ))).all()
+
+    return primeiro_dia_livre(agenda, linhas, a_partir, fim, servico.duracao_minutos)
+
+
+# =========================
+# SESSÃO DO APP FLASK
+# =========================
+# mesmas opções de assinatura do cookie de sessão padrão do Flask
+_interface_sessao = SecureCookieSessionInterface()
+_sessao = URLSafeTimedSerializer(
+    Config.SECRET_KEY,
+    salt=_interface_sessao.salt,
+    serializer=_interface_sessao.serializer,
+    signer_kwargs={
+        'key_derivation': _interface_sessao.key_derivation,
+        'digest_method': _interface_sessao.digest_method,
+    }
+)
+
+
+def reserva_da_sessao(scope):
+    """Token em session['reserva'], ou None sem cookie válido."""
+    for nome, valor in scope.get('headers', []):
+        if nome != b'cookie':
+            continue
+
+        try:
+            cookie = SimpleCookie(valor.decode('latin-1'))
+        except CookieError:
+            return None
+        if 'session' not in cookie:
+            return None
+
+        try:
+            return _sessao.loads(cookie['session'].value).get('reserva')
+        except BadSignature:
+            return None
+
+    return None
+
+
+# =========================
+# APLICAÇÃO ASGI
+# =========================
+# /disponibilidade/<servico_id> e /disponibilidade/<servico_id>/proximo
+ROTA_DISPONIBILIDADE = re.compile(r'/disponibilidade/([0-9]+)(/proximo)?')
+
+
+class AppDisponibilidade:
+
+    def __init__(self):
+        self.engine = None
+        self.cache = None
+
+    def _iniciar(self):
+        self.engine = criar_engine()
+        self.cache = criar_cache_assincrono('agenda', ttl=Config.CACHE_AGENDA_TTL)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+
+        if scope['type'] != 'http':
+            return
+
+        if self.engine is None:
+            self._iniciar()
+
+        metodo, caminho = scope['method'], scope['path']
+        rota = ROTA_DISPONIBILIDADE.fullmatch(caminho)
+        parametros = parse_qs(scope['query_string'].decode())
+
+        if metodo == 'POST' and caminho == '/verificar_horarios':
+            status, corpo = await self._verificar_horarios(
+                receive, reserva_da_sessao(scope)
+            )
+        elif metodo == 'GET' and rota and rota.group(2):
+            status, corpo = await self._proximo(int(rota.group(1)), parametros)
+        elif metodo == 'GET' and rota:
+            status, corpo = await self._disponibilidade(int(rota.group(1)), parametros)
+        else:
+            status, corpo = 404, {'erro': 'Não encontrado'}
+
+        dados = json.dumps(corpo).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(dados)).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': dados})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+
+            if mensagem['type'] == 'lifespan.startup':
+                self._iniciar()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                if self.engine is not None:
+                    await self.engine.dispose()
+                if self.cache is not None:
+                    await self.cache.fechar()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _verificar_horarios(self, receive, reserva=None):
+        corpo = b''
+        while True:
+            mensagem = await receive()
+            corpo += mensagem.get('body', b'')
+            if not mensagem.get('more_body'):
+                break
+
+        try:
+            dados = json.loads(corpo or b'{}')
+        except ValueError:
+            dados = None
+
+        # mesma validação da rota Flask
+        try:
+            dados = dados_verificacao(dados)
+        except ValueError as erro:
+            return 400, {'erro': str(erro)}
+
+        if dados is None:
+            return 200, []
+
+        servico_id, data = dados
+        # a reserva do próprio cliente não esconde o horário dele
+        livres = await livres_periodo(
+            self.engine, servico_id, data, data, self.cache, reserva
+        )
+        if livres is None:
+            return 404, {'erro': 'Serviço não encontrado'}
+
+        return 200, livres[data]
+
+    async def _disponibilidade(self, servico_id, parametros):
+        try:
+            inicio, fim = periodo_consulta(
+                parametros.get('de', [None])[0],
+                parametros.get('ate', [None])[0]
+            )
+        except ValueError:
+            return 400, {'erro': 'Informe o período em de/ate (AAAA-MM-DD)'}
+
+        livres = await livres_periodo(
+            self.engine, servico_id, inicio, fim, self.cache
+        )
+        if livres is None:
+            return 404, {'erro': 'Serviço não encontrado'}
+
+        return 200, {
+            'servico_id': servico_id,
+            'de': inicio.isoformat(),
+            'ate': fim.isoformat(),
+            'dias': {
+                dia.isoformat(): horarios
+                for dia, horarios in livres.items()
+            },
+        }
+
+
+    async def _proximo(self, servico_id, parametros):
+        de = parametros.get('de', [None])[0]
+        try:
+            inicio = (
+                datetime.strptime(de, '%Y-%m-%d').date()
+                if de else datetime.now().date()
+            )
+        except ValueError:
+            return 400, {'erro': 'Data inválida (AAAA-MM-DD)'}
+
+        proximo = await proximo_livre(self.engine, servico_id, inicio, self.cache)
+        if proximo is None:
+            return 404, {'erro': 'Serviço não encontrado'}
+
+        dia, horarios = proximo
+        return 200, {
+            'servico_id': servico_id,
+            'data': dia.isoformat() if dia else None,
+            'horarios': horarios,
+        }
+
+
+app = AppDisponibilidade()
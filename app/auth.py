@@ -1,16 +1,52 @@
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from config import Config
 from .models import db, Usuario
+from .seguranca import ExecutorHash, HashOcupado, LimiteTentativas
 
 auth = Blueprint("auth", __name__)
 
+# 🔹 protege a CPU dos workers contra rajadas de login/cadastro
+limite_login = LimiteTentativas(
+    'login', Config.LOGIN_LIMITE_TENTATIVAS, Config.LOGIN_LIMITE_JANELA
+)
+executor_hash = ExecutorHash(Config.HASH_WORKERS, Config.HASH_ESPERA)
+
+
+def _tentativa_permitida(*chaves):
+    return all(limite_login.permitir(chave) for chave in chaves)
+
+
 @auth.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
+        username = request.form["username"]
+        senha = request.form["password"]
+
+        if not _tentativa_permitida(f"ip:{request.remote_addr}", f"usuario:{username}"):
+            flash("Muitas tentativas. Aguarde um pouco e tente novamente.")
+            return render_template("login.html"), 429
+
         user = Usuario.query.filter_by(
-            username=request.form["username"]
+            username=username
         ).first()
 
-        if user and user.check_password(request.form["password"]):
+        try:
+            senha_ok = user and executor_hash.executar(user.check_password, senha)
+        except HashOcupado:
+            flash("Servidor ocupado. Tente novamente em instantes.")
+            return render_template("login.html"), 503
+
+        if senha_ok:
+            # 🔹 política de hash mudou: refaz com a senha que acabou de ser validada
+            if user.precisa_rehash():
+                try:
+                    executor_hash.executar(
+                        user.set_password, senha, current_app.config["PASSWORD_HASH_METHOD"]
+                    )
+                    db.session.commit()
+                except HashOcupado:
+                    pass  # fica para o próximo login
+
             session["user_id"] = user.id
             session["username"] = user.username
             return redirect(url_for("main.painel"))
@@ -25,6 +61,10 @@ def register():
     if request.method == "POST":
         username = request.form["username"]
 
+        if not _tentativa_permitida(f"ip:{request.remote_addr}"):
+            flash("Muitas tentativas. Aguarde um pouco e tente novamente.")
+            return render_template("register.html"), 429
+
         if Usuario.query.filter_by(username=username).first():
             flash("Usuário já existe")
             return redirect(url_for("auth.register"))
@@ -36,7 +76,14 @@ def register():
             username=username,
             slug=slug
         )
-        user.set_password(request.form["password"])
+
+        try:
+            executor_hash.executar(
+                user.set_password, request.form["password"], current_app.config["PASSWORD_HASH_METHOD"]
+            )
+        except HashOcupado:
+            flash("Servidor ocupado. Tente novamente em instantes.")
+            return render_template("register.html"), 503
 
         db.session.add(user)
         db.session.commit()
@@ -0,0 +1,59 @@
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import raiseload
+
+
+def configurar_engine(app, db):
+    """
+    Ajustes por conexão e uma linha de log com o perfil ativo.
+    Precisa rodar antes da primeira conexão ao banco.
+    """
+    engine = db.engine
+
+    if engine.dialect.name == 'sqlite':
+        journal = app.config['SQLITE_JOURNAL_MODE']
+        synchronous = app.config['SQLITE_SYNCHRONOUS']
+
+        @event.listens_for(engine, 'connect')
+        def _pragmas_sqlite(conexao, _registro):
+            cursor = conexao.cursor()
+            cursor.execute(f'PRAGMA journal_mode={journal}')
+            cursor.execute(f'PRAGMA synchronous={synchronous}')
+            cursor.close()
+
+        perfil = f'journal_mode={journal}, synchronous={synchronous}'
+    else:
+        pool = engine.pool
+        opcoes = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        perfil = (
+            f"pool={pool.size()}+{opcoes.get('max_overflow')}, "
+            f"pre_ping={opcoes.get('pool_pre_ping')}, "
+            f"recycle={opcoes.get('pool_recycle')}s, "
+            f"connect_args={opcoes.get('connect_args', {})}"
+        )
+
+    # sem nível definido o logger herda WARNING e a linha sumiria
+    if not app.logger.level:
+        app.logger.setLevel(logging.INFO)
+
+    app.logger.info(
+        'Banco %s (%s); query_cache_size=%s',
+        engine.dialect.name,
+        perfil,
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'].get('query_cache_size')
+    )
+
+
+def ativar_lazyload_estrito(db):
+    """
+    Modo de teste (LAZYLOAD_ESTRITO): toda query ORM ganha
+    raiseload('*'), então qualquer relacionamento não carregado
+    explicitamente gera erro ao ser acessado em vez de uma query extra.
+    """
+    @event.listens_for(db.session, 'do_orm_execute')
+    def _proibir_lazyload(estado):
+        if estado.is_select and not estado.is_relationship_load:
+            estado.statement = estado.statement.options(
+                raiseload('*', sql_only=True)
+            )
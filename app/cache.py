@@ -0,0 +1,141 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+# =========================
+# CACHE EM MEMÓRIA (POR PROCESSO)
+# =========================
+class CacheLocal:
+    """
+    Cache simples com expiração (TTL) e limite de itens: ao passar do
+    limite, o item usado há mais tempo é descartado (LRU).
+    """
+
+    def __init__(self, ttl=300, max_itens=1024):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+
+# =========================
+# CACHE COMPARTILHADO (REDIS OU COMPATÍVEL)
+# =========================
+class CacheRedis:
+    """
+    Mesmo contrato do CacheLocal, guardando os valores em JSON num
+    servidor Redis (ou compatível), compartilhado entre os workers.
+    A expiração fica a cargo do servidor; a remoção por memória segue
+    a política configurada nele (ex: allkeys-lru).
+    """
+
+    def __init__(self, url, prefixo, ttl=300):
+        import redis  # opcional: só necessário com CACHE_URL
+
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._redis = redis.Redis.from_url(url)
+
+    def _chave(self, chave):
+        return f'{self.prefixo}:{chave}'
+
+    def get(self, chave):
+        valor = self._redis.get(self._chave(chave))
+        return json.loads(valor) if valor is not None else None
+
+    def set(self, chave, valor):
+        self._redis.setex(self._chave(chave), self.ttl, json.dumps(valor))
+
+    def delete(self, chave):
+        self._redis.delete(self._chave(chave))
+
+    def clear(self):
+        chaves = list(self._redis.scan_iter(self._chave('*')))
+        if chaves:
+            self._redis.delete(*chaves)
+
+
+class CacheRedisAssincrono:
+    """
+    Leitura e gravação do CacheRedis para código asyncio, sem bloquear
+    o event loop: mesmas chaves e mesmo JSON, então enxerga as
+    invalidações feitas pelo app Flask.
+    """
+
+    def __init__(self, url, prefixo, ttl=300):
+        from redis import asyncio as redis  # opcional: só com CACHE_URL
+
+        self.ttl = ttl
+        self.prefixo = prefixo
+        self._redis = redis.Redis.from_url(url)
+
+    def _chave(self, chave):
+        return f'{self.prefixo}:{chave}'
+
+    async def get(self, chave):
+        valor = await self._redis.get(self._chave(chave))
+        return json.loads(valor) if valor is not None else None
+
+    async def set(self, chave, valor):
+        await self._redis.setex(self._chave(chave), self.ttl, json.dumps(valor))
+
+    async def fechar(self):
+        await self._redis.aclose()
+
+
+def criar_cache(nome, ttl=300, max_itens=1024):
+    """
+    Cache compartilhado quando CACHE_URL está configurada, senão
+    cache em memória do processo. Os valores devem ser serializáveis
+    em JSON para funcionar nos dois casos.
+    """
+    if Config.CACHE_URL:
+        return CacheRedis(Config.CACHE_URL, prefixo=nome, ttl=ttl)
+
+    return CacheLocal(ttl=ttl, max_itens=max_itens)
+
+
+def criar_cache_assincrono(nome, ttl=300):
+    """
+    Versão assíncrona do criar_cache para outro processo (ASGI) ler o
+    mesmo cache. Só existe com CACHE_URL: um cache em memória de outro
+    processo não recebe as invalidações do app Flask. Sem ela, None.
+    """
+    if Config.CACHE_URL:
+        return CacheRedisAssincrono(Config.CACHE_URL, prefixo=nome, ttl=ttl)
+
+    return None
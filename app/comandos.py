@@ -0,0 +1,104 @@
+import logging
+
+import click
+from flask import current_app
+
+from .models import db
+
+
+# =========================
+# COMANDOS DE MANUTENÇÃO (flask <comando>)
+# =========================
+# create_app() registra estes comandos em todo boot: os módulos de cada
+# um são importados só quando o comando roda, não nos workers.
+@click.command('db-init')
+def db_init():
+    """Cria as tabelas que faltam e aplica as migrações pendentes."""
+    from .migracoes import atualizar_schema
+
+    db.create_all()
+    atualizar_schema(db)
+    click.echo('Banco atualizado.')
+
+
+@click.command('assets-build')
+@click.option('--manter', type=click.IntRange(min=1),
+              help='Builds mantidos em dist/ (padrão: 3).')
+def assets_build(manter):
+    """Gera app/static/dist (nomes com hash, gzip/brotli)."""
+    from .assets import BUILDS_MANTIDOS, construir
+
+    manifesto = construir(current_app.static_folder, manter or BUILDS_MANTIDOS)
+    click.echo(f"{len(manifesto['arquivos'])} arquivos.")
+
+
+@click.command('telefones-backfill')
+@click.option('--lote', default=500, show_default=True)
+def telefones_backfill(lote):
+    """Normaliza os telefones de agendamentos que ainda não têm a chave."""
+    from .telefones import preencher_telefones
+
+    with db.engine.begin() as conn:
+        gravados = preencher_telefones(conn, lote)
+    click.echo(f'{gravados} telefones normalizados.')
+
+
+@click.command('ocupacao-rebuild')
+@click.option('--usuario', type=int, help='Só a agenda deste usuário.')
+def ocupacao_rebuild(usuario):
+    """Refaz o resumo ocupacao_dia a partir dos agendamentos."""
+    from .disponibilidade import reconstruir_ocupacao, usuarios_com_ocupacao
+
+    if usuario:
+        ids = [usuario]
+    else:
+        with db.engine.connect() as conn:
+            ids = usuarios_com_ocupacao(conn)
+
+    dias = 0
+    for usuario_id in ids:
+        # uma transação por agenda para não travar o banco inteiro
+        with db.engine.begin() as conn:
+            dias += reconstruir_ocupacao(conn, usuario_id)
+
+    click.echo(f'{dias} dias recalculados em {len(ids)} agendas.')
+
+
+@click.command('outbox-worker')
+@click.option('--intervalo', default=1.0, show_default=True,
+              help='Espera (s) quando não há eventos.')
+@click.option('--uma-vez', is_flag=True, help='Esvazia a fila e sai.')
+def outbox_worker(intervalo, uma_vez):
+    """Processa os eventos do outbox (avisos, webhooks) em lotes."""
+    from .outbox import executar_worker
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+    )
+    executar_worker(intervalo, uma_vez)
+
+
+@click.command('agendamentos-arquivar')
+@click.option('--meses', type=click.IntRange(min=0),
+              help='Meses mantidos em agendamento (padrão: ARQUIVO_MESES).')
+@click.option('--lote', default=1000, show_default=True)
+def agendamentos_arquivar(meses, lote):
+    """Move os agendamentos de meses passados para agendamento_arquivo."""
+    from .arquivo import arquivar_agendamentos, inicio_periodo_ativo
+
+    antes_de = inicio_periodo_ativo(meses=meses)
+    movidos = arquivar_agendamentos(antes_de, lote)
+    click.echo(
+        f'{movidos} agendamentos arquivados '
+        f'(anteriores a {antes_de.strftime("%d/%m/%Y")}).'
+    )
+
+
+def registrar_comandos(app):
+    app.cli.add_command(db_init)
+    app.cli.add_command(assets_build)
+    app.cli.add_command(telefones_backfill)
+    app.cli.add_command(ocupacao_rebuild)
+    app.cli.add_command(outbox_worker)
+    app.cli.add_command(agendamentos_arquivar)
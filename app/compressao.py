@@ -0,0 +1,75 @@
+"""
+Compressão das respostas HTML e JSON geradas pelas rotas.
+
+O corpo é comprimido no after_request quando passa de
+COMPRESSAO_MIN_BYTES e o navegador aceita: brotli (se o pacote estiver
+instalado) ou gzip, conforme a preferência do Accept-Encoding.
+Respostas em fluxo (exportação), arquivos estáticos (servidos do disco
+e, após `flask assets-build`, já pré-comprimidos) e respostas que já
+tenham Content-Encoding passam direto.
+"""
+import gzip
+
+from flask import request
+
+try:
+    import brotli  # opcional
+except ImportError:
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = ('text/html', 'application/json')
+
+
+def _codificacao(opcoes):
+    """Melhor codificação aceita pelo navegador, ou None."""
+    escolhida = request.accept_encodings.best_match(opcoes)
+    return escolhida if escolhida in opcoes else None
+
+
+def iniciar_compressao(app):
+    if not app.config['COMPRESSAO_ATIVA']:
+        return
+
+    minimo = app.config['COMPRESSAO_MIN_BYTES']
+    nivel_gzip = app.config['COMPRESSAO_NIVEL_GZIP']
+    nivel_brotli = app.config['COMPRESSAO_NIVEL_BROTLI']
+
+    # em empate no Accept-Encoding, vale a ordem daqui
+    opcoes = ['br', 'gzip'] if brotli else ['gzip']
+
+    @app.after_request
+    def _comprimir(resposta):
+        if (
+            resposta.mimetype not in TIPOS_COMPRIMIVEIS
+            or resposta.status_code != 200
+            or resposta.direct_passthrough
+            or resposta.is_streamed
+            or 'Content-Encoding' in resposta.headers
+            or resposta.cache_control.no_transform
+        ):
+            return resposta
+
+        corpo = resposta.get_data()
+        if len(corpo) < minimo:
+            return resposta
+
+        # a mesma URL pode voltar comprimida ou não
+        resposta.vary.add('Accept-Encoding')
+
+        codificacao = _codificacao(opcoes)
+        if codificacao is None:
+            return resposta
+
+        if codificacao == 'br':
+            resposta.set_data(brotli.compress(corpo, quality=nivel_brotli))
+        else:
+            resposta.set_data(gzip.compress(corpo, compresslevel=nivel_gzip))
+
+        resposta.headers['Content-Encoding'] = codificacao
+
+        # outra sequência de bytes: o ETag forte deixaria de valer
+        etag, fraco = resposta.get_etag()
+        if etag and not fraco:
+            resposta.set_etag(etag, weak=True)
+
+        return resposta
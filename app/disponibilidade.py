@@ -0,0 +1,790 @@
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, null, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import Config
+from .cache import criar_cache
+from .models import (
+    db, Agendamento, ConfiguracaoAgenda, ExcecaoAgenda, OcupacaoDia,
+    ReservaHorario, Usuario
+)
+
+# limite de dias por consulta (evita varreduras enormes vindas do público)
+MAX_DIAS_PERIODO = 62
+
+# limite de dias gerados por uma única edição de exceções
+MAX_DIAS_EXCECOES = 366
+
+# linhas por INSERT no upsert de exceções
+LOTE_EXCECOES = 200
+
+MINUTOS_DIA = 24 * 60
+BYTES_DIA = MINUTOS_DIA // 8
+
+# duração de cada horário base quando a agenda só tem um horário
+PASSO_PADRAO = 60
+
+
+# =========================
+# CONVERSÕES
+# =========================
+def para_minutos(hhmm):
+    """'09:30' -> 570 (inteiros são devolvidos como estão)"""
+    if isinstance(hhmm, int):
+        return hhmm
+    horas, minutos = str(hhmm).strip().split(':')
+    return int(horas) * 60 + int(minutos)
+
+
+def para_hhmm(minutos):
+    """570 -> '09:30'"""
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def normalizar_horarios(horarios):
+    """
+    Formato único salvo no banco: minutos desde 00:00, ordenados.
+    Aceita lista de 'HH:MM'/inteiros ou o formato antigo '08:00,09:00'.
+    """
+    if not horarios:
+        return []
+    if isinstance(horarios, str):
+        horarios = [h for h in horarios.split(',') if h.strip()]
+
+    minutos = {para_minutos(h) for h in horarios}
+    if any(not 0 <= m < MINUTOS_DIA for m in minutos):
+        raise ValueError('horário fora do dia')
+    return sorted(minutos)
+
+
+def normalizar_dias(dias):
+    """[0..6] ordenados; aceita também o formato antigo '0,1,2'."""
+    if not dias:
+        return []
+    if isinstance(dias, str):
+        dias = [d for d in dias.split(',') if d.strip()]
+
+    dias = {int(d) for d in dias}
+    if any(not 0 <= d <= 6 for d in dias):
+        raise ValueError('dia da semana inválido')
+    return sorted(dias)
+
+
+def passo_agenda(slots):
+    """
+    Duração de cada horário base: a menor distância entre dois
+    horários consecutivos (ex: 08:00, 08:30, 09:00 -> 30 minutos).
+    """
+    distancias = [b - a for a, b in zip(slots, slots[1:]) if b > a]
+    return min(distancias) if distancias else PASSO_PADRAO
+
+
+# =========================
+# BITMAP DE MINUTOS
+# =========================
+# Cada dia é um inteiro de 1440 bits: o bit N representa o minuto N.
+# União, subtração e teste de encaixe viram operações de bits, então
+# o custo por dia é O(horários + agendamentos).
+def intervalo(inicio, duracao):
+    """Máscara dos minutos [inicio, inicio + duracao), limitada ao dia."""
+    fim = min(inicio + duracao, MINUTOS_DIA)
+    if fim <= inicio:
+        return 0
+    return ((1 << (fim - inicio)) - 1) << inicio
+
+
+def mascara_ocupada(ocupados, passo):
+    """[(inicio, duracao)] -> máscara dos minutos agendados."""
+    agendado = 0
+    for inicio, dur in ocupados:
+        agendado |= intervalo(inicio, dur or passo)
+    return agendado
+
+
+def para_bytes(mascara):
+    return mascara.to_bytes(BYTES_DIA, 'little')
+
+
+def de_bytes(dados):
+    return int.from_bytes(dados, 'little') if dados else 0
+
+
+def inicios_livres(slots, passo, bloqueados, agendado, duracao):
+    """
+    slots:      horários base do dia, em minutos e ordenados
+    passo:      duração de cada horário base
+    bloqueados: horários base desativados no dia (minutos)
+    agendado:   máscara dos minutos já agendados (ver mascara_ocupada)
+    duracao:    duração do serviço solicitado
+
+    Retorna os horários base em que o serviço inteiro cabe dentro do
+    expediente sem sobrepor nenhum agendamento.
+    """
+    candidatos = [s for s in slots if s not in bloqueados]
+
+    expediente = 0
+    for s in candidatos:
+        expediente |= intervalo(s, passo)
+
+    livre = expediente & ~agendado
+
+    resultado = []
+    for s in candidatos:
+        necessario = intervalo(s, duracao)
+        if s + duracao <= MINUTOS_DIA and livre & necessario == necessario:
+            resultado.append(s)
+
+    return resultado
+
+
+# =========================
+# CONFIGURAÇÃO DA AGENDA (CACHE)
+# =========================
+# A configuração e as exceções mudam pouco e são lidas em toda consulta
+# de disponibilidade: ficam em cache já convertidas para minutos.
+# As rotas que salvam a agenda chamam invalidar_agenda().
+cache_agenda = criar_cache('agenda', ttl=Config.CACHE_AGENDA_TTL)
+
+
+def invalidar_agenda(usuario_id):
+    cache_agenda.delete(usuario_id)
+
+
+def montar_agenda(config, excecoes):
+    """
+    Converte as linhas do banco (config e exceções, de qualquer origem)
+    na agenda já processada:
+    {'configurada', 'dias', 'slots', 'passo', 'excecoes': {iso: {...}}}
+    """
+    if config is None:
+        return {'configurada': False}
+
+    slots = normalizar_horarios(config.horarios_base)
+
+    return {
+        'configurada': True,
+        'dias': normalizar_dias(config.dias_semana),
+        'slots': slots,
+        'passo': passo_agenda(slots),
+        'excecoes': {
+            ex.data.isoformat(): {
+                'ativo': ex.dia_ativo is not False,
+                'bloqueados': normalizar_horarios(ex.horarios_bloqueados),
+            }
+            for ex in excecoes
+        },
+    }
+
+
+def _ler_agenda(executor, usuario_id):
+    """Agenda direto do banco, por uma sessão ou conexão."""
+    config = executor.execute(
+        select(
+            ConfiguracaoAgenda.dias_semana,
+            ConfiguracaoAgenda.horarios_base
+        ).where(ConfiguracaoAgenda.usuario_id == usuario_id)
+    ).first()
+
+    excecoes = []
+    if config:
+        excecoes = executor.execute(
+            select(
+                ExcecaoAgenda.data,
+                ExcecaoAgenda.dia_ativo,
+                ExcecaoAgenda.horarios_bloqueados
+            ).where(ExcecaoAgenda.usuario_id == usuario_id)
+        ).all()
+
+    return montar_agenda(config, excecoes)
+
+
+def carregar_agenda(usuario_id):
+    agenda = cache_agenda.get(usuario_id)
+
+    if agenda is None:
+        agenda = _ler_agenda(db.session, usuario_id)
+        cache_agenda.set(usuario_id, agenda)
+
+    return agenda
+
+
+# =========================
+# AGENDAMENTOS DO PERÍODO
+# =========================
+def agrupar_ocupados(linhas):
+    """Linhas (data, horario, duracao) -> {data: [(minuto, duração)]}"""
+    ocupados = {}
+
+    for data, horario, duracao in linhas:
+        ocupados.setdefault(data, []).append(
+            (horario.hour * 60 + horario.minute, duracao)
+        )
+
+    return ocupados
+
+
+# =========================
+# RESUMO DE OCUPAÇÃO POR DIA
+# =========================
+# ocupacao_dia guarda, para cada dia com agendamentos, a máscara dos
+# minutos agendados, quantos horários base continuam livres e se o dia
+# lotou. As consultas de disponibilidade leem uma linha curta por dia
+# em vez dos agendamentos; dias sem linha não têm agendamentos.
+#
+# Toda gravação em agendamento chama atualizar_ocupacao() para as datas
+# afetadas, e as gravações na agenda chamam recalcular_ocupacao(), antes
+# do commit. `flask ocupacao-rebuild` refaz tudo a partir dos agendamentos.
+def consulta_ocupacao(usuario_id, inicio, fim, agora, reserva=None):
+    """
+    SELECT (sem executar) do resumo do período e das reservas vigentes
+    (ver RESERVAS TEMPORÁRIAS), numa única ida ao banco. Linhas
+    (data, minutos_ocupados, lotado, inicio, duracao): as do resumo têm
+    os dois primeiros campos, as de reserva os dois últimos. A reserva
+    do próprio cliente (`reserva`) fica de fora.
+    """
+    resumo = select(
+        OcupacaoDia.data,
+        OcupacaoDia.minutos_ocupados,
+        OcupacaoDia.lotado,
+        null().label('inicio'),
+        null().label('duracao')
+    ).where(
+        OcupacaoDia.usuario_id == usuario_id,
+        OcupacaoDia.data >= inicio,
+        OcupacaoDia.data <= fim
+    )
+
+    reservas = _reservas_vigentes(
+        select(
+            ReservaHorario.data,
+            null(),
+            null(),
+            ReservaHorario.inicio,
+            ReservaHorario.duracao
+        ),
+        usuario_id, inicio, fim, agora, reserva
+    )
+
+    return resumo.union_all(reservas)
+
+
+def _reservas_vigentes(consulta, usuario_id, inicio, fim, agora, reserva=None):
+    """Filtra `consulta` (sobre reserva_horario) às reservas dos outros clientes."""
+    consulta = consulta.where(
+        ReservaHorario.usuario_id == usuario_id,
+        ReservaHorario.data >= inicio,
+        ReservaHorario.data <= fim,
+        ReservaHorario.expira_em > agora
+    )
+
+    if reserva:
+        consulta = consulta.where(ReservaHorario.token != reserva)
+
+    return consulta
+
+
+def agrupar_ocupacao(linhas, passo):
+    """Linhas de consulta_ocupacao -> {data: máscara}"""
+    ocupacao = {}
+
+    for data, minutos, _, inicio, duracao in linhas:
+        if minutos is not None:
+            mascara = de_bytes(minutos)
+        else:
+            mascara = intervalo(inicio, duracao or passo)
+        ocupacao[data] = ocupacao.get(data, 0) | mascara
+
+    return ocupacao
+
+
+def carregar_ocupacao(usuario_id, inicio, fim, passo, reserva=None):
+    return agrupar_ocupacao(db.session.execute(consulta_ocupacao(
+        usuario_id, inicio, fim, datetime.utcnow(), reserva
+    )), passo)
+
+
+_upserts_ocupacao = {}
+
+
+def _upsert_ocupacao(nome_dialeto):
+    """INSERT ... ON CONFLICT (usuario_id, data) DO UPDATE, montado uma vez."""
+    if nome_dialeto not in _upserts_ocupacao:
+        dialeto = postgresql if nome_dialeto == 'postgresql' else sqlite
+        stmt = dialeto.insert(OcupacaoDia.__table__)
+        _upserts_ocupacao[nome_dialeto] = stmt.on_conflict_do_update(
+            index_elements=['usuario_id', 'data'],
+            set_={
+                'minutos_ocupados': stmt.excluded.minutos_ocupados,
+                'livres': stmt.excluded.livres,
+                'lotado': stmt.excluded.lotado,
+                'atualizado_em': stmt.excluded.atualizado_em,
+            }
+        )
+    return _upserts_ocupacao[nome_dialeto]
+
+
+def _regravar_ocupacao(executor, usuario_id, agenda, datas=None, desde=None):
+    """
+    Refaz as linhas de ocupacao_dia do usuário a partir dos agendamentos:
+    só das datas informadas, de `desde` em diante, ou todas. Dias que
+    ficaram sem agendamentos perdem a linha. Retorna quantos dias gravou.
+    """
+    tabela = OcupacaoDia.__table__
+
+    def filtrar(consulta, coluna_usuario, coluna_data):
+        consulta = consulta.where(coluna_usuario == usuario_id)
+        if datas is not None:
+            consulta = consulta.where(coluna_data.in_(datas))
+        if desde is not None:
+            consulta = consulta.where(coluna_data >= desde)
+        return consulta
+
+    por_dia = agrupar_ocupados(executor.execute(filtrar(
+        select(
+            Agendamento.data,
+            Agendamento.horario,
+            Agendamento.duracao_minutos
+        ),
+        Agendamento.usuario_id, Agendamento.data
+    )))
+
+    # atualização pontual: só apaga quando algum dia ficou vazio
+    if datas is None or set(datas) - set(por_dia):
+        executor.execute(filtrar(
+            delete(tabela), tabela.c.usuario_id, tabela.c.data
+        ).where(tabela.c.data.not_in(list(por_dia))))
+
+    if not por_dia:
+        return 0
+
+    passo = agenda.get('passo', PASSO_PADRAO)
+    agora = datetime.utcnow()
+    linhas = []
+
+    for dia, ocupados in por_dia.items():
+        agendado = mascara_ocupada(ocupados, passo)
+        livres = len(livres_dia(agenda, dia, agendado, passo))
+
+        linhas.append({
+            'usuario_id': usuario_id,
+            'data': dia,
+            'minutos_ocupados': para_bytes(agendado),
+            'livres': livres,
+            'lotado': livres == 0,
+            'atualizado_em': agora,
+        })
+
+    executor.execute(_upsert_ocupacao(db.engine.dialect.name), linhas)
+
+    return len(linhas)
+
+
+def atualizar_ocupacao(usuario_id, datas):
+    """
+    Após incluir/remover agendamentos nessas datas, na mesma transação
+    e com a agenda já travada (travar_agenda). Não faz commit.
+    """
+    datas = set(datas)
+    if datas:
+        _regravar_ocupacao(
+            db.session, usuario_id, carregar_agenda(usuario_id), datas=datas
+        )
+
+
+def recalcular_ocupacao(usuario_id, desde=None):
+    """
+    Após alterar a configuração ou as exceções (ainda sem commit): refaz
+    os dias de hoje em diante com a agenda nova, lida da própria sessão.
+    Dias passados ficam como estavam até um ocupacao-rebuild.
+    Não faz commit.
+    """
+    travar_agenda(usuario_id)
+    _regravar_ocupacao(
+        db.session, usuario_id, _ler_agenda(db.session, usuario_id),
+        desde=desde or datetime.now().date()
+    )
+
+
+def usuarios_com_ocupacao(conn):
+    return conn.execute(
+        select(Agendamento.usuario_id).union(select(OcupacaoDia.usuario_id))
+    ).scalars().all()
+
+
+def reconstruir_ocupacao(conn, usuario_id=None):
+    """
+    Refaz todo o resumo (de um usuário ou de todos) por uma conexão.
+    Retorna quantos dias gravou.
+    """
+    ids = [usuario_id] if usuario_id else usuarios_com_ocupacao(conn)
+
+    return sum(
+        _regravar_ocupacao(conn, uid, _ler_agenda(conn, uid))
+        for uid in ids
+    )
+
+
+# =========================
+# RESERVAS TEMPORÁRIAS
+# =========================
+# Entre a confirmação e o envio dos dados o horário fica segurado por
+# Config.RESERVA_TTL segundos: some das consultas de disponibilidade de
+# todos, menos de quem tem o token. Vencidas valem como inexistentes, então
+# a limpeza pode ser preguiçosa (a cada nova reserva na mesma agenda).
+def criar_reserva(usuario_id, data, inicio, duracao, substituir=None):
+    """
+    Segura o horário e devolve o token. Chamar com a agenda travada e
+    depois de conferir a disponibilidade. `substituir` é a reserva
+    anterior do mesmo cliente, liberada aqui. Não faz commit.
+    """
+    agora = datetime.utcnow()
+
+    condicao = ReservaHorario.expira_em <= agora
+    if substituir:
+        condicao = condicao | (ReservaHorario.token == substituir)
+
+    db.session.execute(
+        delete(ReservaHorario).where(
+            ReservaHorario.usuario_id == usuario_id, condicao
+        ),
+        execution_options={'synchronize_session': False}
+    )
+
+    token = secrets.token_urlsafe(16)
+    db.session.add(ReservaHorario(
+        usuario_id=usuario_id,
+        data=data,
+        inicio=inicio,
+        duracao=duracao,
+        token=token,
+        expira_em=agora + timedelta(seconds=Config.RESERVA_TTL)
+    ))
+    return token
+
+
+def consumir_reserva(token):
+    """Libera a reserva usada no agendamento. Não faz commit."""
+    if token:
+        db.session.execute(
+            delete(ReservaHorario).where(ReservaHorario.token == token),
+            execution_options={'synchronize_session': False}
+        )
+
+
+# =========================
+# CÁLCULO POR PERÍODO
+# =========================
+def periodo_consulta(de, ate=None):
+    """
+    Valida o período pedido pelo público ('AAAA-MM-DD'), limitando-o a
+    MAX_DIAS_PERIODO dias. Lança ValueError se inválido.
+    """
+    if not de:
+        raise ValueError('período não informado')
+
+    inicio = datetime.strptime(de, '%Y-%m-%d').date()
+    fim = datetime.strptime(ate or de, '%Y-%m-%d').date()
+
+    if fim < inicio:
+        raise ValueError('período inválido')
+
+    if (fim - inicio).days + 1 > MAX_DIAS_PERIODO:
+        fim = inicio + timedelta(days=MAX_DIAS_PERIODO - 1)
+
+    return inicio, fim
+
+
+def dados_verificacao(dados):
+    """
+    Valida o JSON de /verificar_horarios (mesma regra no app Flask e no
+    ASGI): (servico_id, data), ou None se faltar um dos dois (a resposta
+    é a lista vazia). Lança ValueError com a mensagem de erro.
+    """
+    if not isinstance(dados, dict) or not dados.get('data') or not dados.get('servico_id'):
+        return None
+
+    try:
+        servico_id = int(dados['servico_id'])
+    except (TypeError, ValueError):
+        raise ValueError('servico_id inválido')
+
+    try:
+        data = datetime.strptime(dados['data'], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('Data inválida (AAAA-MM-DD)')
+
+    return servico_id, data
+
+
+def livres_dia(agenda, dia, agendado, duracao):
+    """Horários (minutos) livres no dia para a duração pedida."""
+    if not agenda['configurada'] or dia.weekday() not in agenda['dias']:
+        return []
+
+    excecao = agenda['excecoes'].get(dia.isoformat())
+    if excecao and not excecao['ativo']:
+        return []
+
+    bloqueados = set(excecao['bloqueados']) if excecao else set()
+
+    return inicios_livres(
+        agenda['slots'], agenda['passo'], bloqueados, agendado, duracao
+    )
+
+
+def calcular_periodo(agenda, ocupacao, inicio, fim, duracao=None):
+    """
+    Parte pura do cálculo: {data: [horários livres]} para o período.
+    ocupacao: {data: máscara dos minutos agendados} (ver agrupar_ocupacao)
+    """
+    resultado = {}
+    duracao = duracao or agenda.get('passo')
+    dia = inicio
+
+    while dia <= fim:
+        resultado[dia] = [
+            para_hhmm(m)
+            for m in livres_dia(agenda, dia, ocupacao.get(dia, 0), duracao)
+        ]
+        dia += timedelta(days=1)
+
+    return resultado
+
+
+def horarios_livres_periodo(usuario_id, inicio, fim, duracao=None, reserva=None):
+    """
+    Retorna {data: [horários livres]} para cada dia entre inicio e fim.
+    Sem duração informada, cada horário ocupa um único horário base.
+    Horários reservados por outros clientes não aparecem; `reserva` é
+    o token do próprio cliente, cujo horário continua visível.
+    """
+    agenda = carregar_agenda(usuario_id)
+
+    ocupacao = {}
+    if agenda['configurada']:
+        ocupacao = carregar_ocupacao(
+            usuario_id, inicio, fim, agenda['passo'], reserva
+        )
+
+    return calcular_periodo(agenda, ocupacao, inicio, fim, duracao)
+
+
+def mascaras_gravacao(usuario_id, datas, passo, reserva=None):
+    """
+    {data: máscara dos minutos ocupados} nas `datas`, pelos próprios
+    agendamentos e pelas reservas vigentes dos outros clientes, numa
+    única query pelo índice (usuario_id, data, ...). Para conferir
+    gravações com a agenda já travada: não usa o resumo ocupacao_dia,
+    que só serve às leituras; se ele divergir, a gravação continua
+    correta. Datas sem nada ocupado ficam de fora.
+    """
+    datas = set(datas)
+    if not datas:
+        return {}
+
+    agendamentos = select(
+        Agendamento.data,
+        Agendamento.horario,
+        null().label('inicio'),
+        Agendamento.duracao_minutos
+    ).where(
+        Agendamento.usuario_id == usuario_id,
+        Agendamento.data.in_(datas)
+    )
+
+    reservas = _reservas_vigentes(
+        select(ReservaHorario.data, null(), ReservaHorario.inicio, ReservaHorario.duracao),
+        usuario_id, min(datas), max(datas), datetime.utcnow(), reserva
+    )
+
+    mascaras = {}
+    for data, horario, inicio, duracao in db.session.execute(
+        agendamentos.union_all(reservas)
+    ):
+        if horario is not None:
+            inicio = horario.hour * 60 + horario.minute
+        mascaras[data] = mascaras.get(data, 0) | intervalo(inicio, duracao or passo)
+
+    return mascaras
+
+
+def horarios_livres_gravacao(usuario_id, data, duracao=None, reserva=None):
+    """
+    Conferência final antes de gravar (agenda já travada): horários
+    livres no dia calculados dos próprios agendamentos e das reservas
+    vigentes (ver mascaras_gravacao).
+    """
+    agenda = carregar_agenda(usuario_id)
+    if not agenda['configurada']:
+        return []
+
+    passo = agenda['passo']
+    agendado = mascaras_gravacao(usuario_id, [data], passo, reserva).get(data, 0)
+
+    return [
+        para_hhmm(m)
+        for m in livres_dia(agenda, data, agendado, duracao or passo)
+    ]
+
+
+def proximo_dia_livre(usuario_id, a_partir, duracao=None, dias=MAX_DIAS_PERIODO):
+    """
+    Primeiro dia, em até `dias` dias a partir de a_partir, com algum
+    horário para a duração pedida: (data, [horários]) ou (None, []).
+    Dias lotados no resumo são pulados sem cálculo.
+    """
+    agenda = carregar_agenda(usuario_id)
+    if not agenda['configurada']:
+        return None, []
+
+    fim = a_partir + timedelta(days=dias - 1)
+
+    linhas = db.session.execute(
+        consulta_ocupacao(usuario_id, a_partir, fim, datetime.utcnow())
+    ).all()
+
+    return primeiro_dia_livre(agenda, linhas, a_partir, fim, duracao)
+
+
+def primeiro_dia_livre(agenda, linhas, a_partir, fim, duracao=None):
+    """
+    Parte de proximo_dia_livre() sem acesso ao banco: `linhas` é o
+    resultado de consulta_ocupacao() no período (também usado no ASGI).
+    """
+    duracao = duracao or agenda['passo']
+
+    ocupacao = agrupar_ocupacao(linhas, agenda['passo'])
+    for linha in linhas:
+        if linha.lotado:
+            ocupacao[linha.data] = None
+
+    dia = a_partir
+    while dia <= fim:
+        agendado = ocupacao.get(dia, 0)
+
+        if agendado is not None:
+            livres = livres_dia(agenda, dia, agendado, duracao)
+            if livres:
+                return dia, [para_hhmm(m) for m in livres]
+
+        dia += timedelta(days=1)
+
+    return None, []
+
+
+# =========================
+# CONCORRÊNCIA
+# =========================
+def travar_agenda(usuario_id):
+    """
+    Serializa as gravações na agenda de um profissional até o commit,
+    para que a verificação de disponibilidade e o INSERT sejam atômicos.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # SQLite não tem FOR UPDATE: uma escrita nula já obtém o lock
+        # de escrita do banco, e os concorrentes aguardam o commit
+        db.session.execute(
+            text('UPDATE usuario SET id = id WHERE id = :id'),
+            {'id': usuario_id}
+        )
+    else:
+        db.session.query(Usuario.id).filter_by(
+            id=usuario_id
+        ).with_for_update().first()
+
+
+# =========================
+# EDIÇÃO DE EXCEÇÕES EM LOTE
+# =========================
+def expandir_excecoes(excecoes):
+    """
+    Converte a lista recebida em {data: (dia_ativo, horarios_bloqueados)}.
+    Cada item pode ser:
+    - uma data:          {"data": "2025-12-25", "dia_ativo": false}
+    - um período:        {"de": "2025-12-20", "ate": "2026-01-05", ...}
+    - uma regra semanal: período + {"dias_semana": [5, 6]}
+    Itens posteriores sobrescrevem os anteriores na mesma data e os
+    horários bloqueados saem em minutos.
+    Lança ValueError para formato ou datas inválidos e períodos grandes
+    demais.
+    """
+    if not isinstance(excecoes, list):
+        raise ValueError('exceções devem vir em uma lista')
+
+    por_data = {}
+
+    for ex in excecoes:
+        if not isinstance(ex, dict):
+            raise ValueError('exceção inválida')
+
+        try:
+            if 'data' in ex:
+                inicio = fim = datetime.strptime(ex['data'], '%Y-%m-%d').date()
+            else:
+                inicio = datetime.strptime(ex['de'], '%Y-%m-%d').date()
+                fim = datetime.strptime(ex['ate'], '%Y-%m-%d').date()
+
+            dias_semana = ex.get('dias_semana')
+            if dias_semana is not None:
+                dias_semana = normalizar_dias(dias_semana)
+
+            horarios = normalizar_horarios(ex.get('horarios'))
+        except (KeyError, TypeError):
+            raise ValueError('exceção inválida')
+
+        if fim < inicio or (fim - inicio).days >= MAX_DIAS_EXCECOES:
+            raise ValueError('período inválido')
+
+        dia_ativo = ex.get('dia_ativo', True)
+        if not isinstance(dia_ativo, bool):
+            raise ValueError('dia_ativo deve ser true ou false')
+
+        valor = (dia_ativo, horarios)
+
+        dia = inicio
+        while dia <= fim:
+            if dias_semana is None or dia.weekday() in dias_semana:
+                por_data[dia] = valor
+            dia += timedelta(days=1)
+
+        if len(por_data) > MAX_DIAS_EXCECOES:
+            raise ValueError('exceções demais em uma única edição')
+
+    return por_data
+
+
+def salvar_excecoes(usuario_id, por_data):
+    """
+    Upsert em lote pela restrição única (usuario_id, data):
+    INSERT ... ON CONFLICT DO UPDATE, no SQLite e no Postgres.
+    Não faz commit.
+    """
+    if not por_data:
+        return
+
+    dialeto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    agora = datetime.utcnow()
+
+    linhas = [
+        {
+            'usuario_id': usuario_id,
+            'data': dia,
+            'dia_ativo': ativo,
+            'horarios_bloqueados': horarios,
+            'criado_em': agora,
+        }
+        for dia, (ativo, horarios) in sorted(por_data.items())
+    ]
+
+    for i in range(0, len(linhas), LOTE_EXCECOES):
+        stmt = dialeto.insert(ExcecaoAgenda).values(linhas[i:i + LOTE_EXCECOES])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['usuario_id', 'data'],
+            set_={
+                'dia_ativo': stmt.excluded.dia_ativo,
+                'horarios_bloqueados': stmt.excluded.horarios_bloqueados,
+            }
+        )
+        db.session.execute(stmt)
@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+# limites dos buckets do histograma de latência (segundos)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+# =========================
+# REGISTRO (POR PROCESSO)
+# =========================
+class Metricas:
+    """
+    Latência, número de queries e tempo de banco por endpoint.
+    Cada worker mantém os seus números; o Prometheus soma os workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def registrar(self, endpoint, duracao, consultas, tempo_db):
+        with self._lock:
+            dados = self._endpoints.get(endpoint)
+            if dados is None:
+                dados = self._endpoints[endpoint] = {
+                    'buckets': [0] * (len(BUCKETS) + 1),
+                    'soma': 0.0,
+                    'total': 0,
+                    'consultas': 0,
+                    'tempo_db': 0.0,
+                }
+
+            dados['buckets'][bisect_left(BUCKETS, duracao)] += 1
+            dados['soma'] += duracao
+            dados['total'] += 1
+            dados['consultas'] += consultas
+            dados['tempo_db'] += tempo_db
+
+    def texto_prometheus(self):
+        with self._lock:
+            endpoints = {
+                nome: {**dados, 'buckets': list(dados['buckets'])}
+                for nome, dados in self._endpoints.items()
+            }
+
+        linhas = [
+            '# HELP http_request_duration_seconds Latência das requisições.',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for nome, dados in sorted(endpoints.items()):
+            acumulado = 0
+            for limite, quantidade in zip(BUCKETS + ('+Inf',), dados['buckets']):
+                acumulado += quantidade
+                linhas.append(
+                    f'http_request_duration_seconds_bucket'
+                    f'{{endpoint="{nome}",le="{limite}"}} {acumulado}'
+                )
+            linhas.append(f'http_request_duration_seconds_sum{{endpoint="{nome}"}} {dados["soma"]:.6f}')
+            linhas.append(f'http_request_duration_seconds_count{{endpoint="{nome}"}} {dados["total"]}')
+
+        linhas += [
+            '# HELP db_queries_total Queries SQL executadas.',
+            '# TYPE db_queries_total counter',
+        ]
+        for nome, dados in sorted(endpoints.items()):
+            linhas.append(f'db_queries_total{{endpoint="{nome}"}} {dados["consultas"]}')
+
+        linhas += [
+            '# HELP db_time_seconds_total Tempo gasto no banco.',
+            '# TYPE db_time_seconds_total counter',
+        ]
+        for nome, dados in sorted(endpoints.items()):
+            linhas.append(f'db_time_seconds_total{{endpoint="{nome}"}} {dados["tempo_db"]:.6f}')
+
+        return '\n'.join(linhas) + '\n'
+
+
+# =========================
+# INSTALAÇÃO NO APP
+# =========================
+def iniciar_metricas(app, db):
+    """
+    Só instala hooks e listeners com METRICS_ENABLED; desligado, o
+    custo por requisição é zero.
+    """
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    metricas = Metricas()
+    app.extensions['metricas'] = metricas
+
+    @app.before_request
+    def _inicio_requisicao():
+        g.metricas_inicio = time.perf_counter()
+        g.metricas_consultas = 0
+        g.metricas_tempo_db = 0.0
+
+    @app.after_request
+    def _fim_requisicao(resposta):
+        inicio = g.pop('metricas_inicio', None)
+        if inicio is None:
+            return resposta
+
+        duracao = time.perf_counter() - inicio
+        consultas = g.metricas_consultas
+        tempo_db = g.metricas_tempo_db
+
+        metricas.registrar(
+            request.endpoint or 'desconhecido', duracao, consultas, tempo_db
+        )
+
+        resposta.headers.add(
+            'Server-Timing',
+            f'app;dur={duracao * 1000:.1f}, '
+            f'db;dur={tempo_db * 1000:.1f};desc="{consultas} queries"'
+        )
+        return resposta
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes_sql(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _depois_sql(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info['metricas_inicio'].pop()
+        if has_request_context() and 'metricas_inicio' in g:
+            g.metricas_consultas += 1
+            g.metricas_tempo_db += time.perf_counter() - inicio
+
+    def exportar():
+        return Response(
+            metricas.texto_prometheus(),
+            mimetype='text/plain; version=0.0.4'
+        )
+
+    app.add_url_rule('/metrics', 'metricas', exportar)
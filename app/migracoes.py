@@ -0,0 +1,163 @@
+import logging
+
+from datetime import datetime
+
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.exc import DBAPIError
+
+log = logging.getLogger(__name__)
+
+# =========================
+# COLUNAS ADICIONADAS APÓS A CRIAÇÃO DAS TABELAS
+# =========================
+# db.create_all() não altera tabelas existentes, então bancos antigos
+# (SQLite ou Postgres) recebem as colunas novas por aqui.
+COLUNAS_NOVAS = [
+    ('agendamento', 'servico_id', 'INTEGER REFERENCES servico(id) ON DELETE SET NULL'),
+    ('agendamento', 'duracao_minutos', 'INTEGER'),
+    ('usuario', 'versao_vitrine', 'INTEGER NOT NULL DEFAULT 0'),
+    ('agendamento', 'telefone_normalizado', 'VARCHAR(16)'),
+]
+
+# =========================
+# ÍNDICES (mesmos nomes declarados em models.py)
+# =========================
+# (nome, tabela, colunas, único)
+INDICES = [
+    ('uq_agendamento_usuario_data_horario', 'agendamento', ('usuario_id', 'data', 'horario'), True),
+    ('ix_agendamento_telefone_norm_data', 'agendamento', ('telefone_normalizado', 'data'), False),
+    ('ix_agendamento_usuario_telefone_norm_data', 'agendamento', ('usuario_id', 'telefone_normalizado', 'data'), False),
+]
+
+# índices substituídos, removidos dos bancos existentes
+INDICES_REMOVIDOS = [
+    'ix_agendamento_telefone',
+    'ix_agendamento_usuario_telefone',
+]
+
+
+# =========================
+# MIGRAÇÕES DE DADOS (EXECUTADAS UMA ÚNICA VEZ)
+# =========================
+def _horarios_em_minutos(conn):
+    """
+    Agendas antigas guardavam '0,1,2' / '08:00,09:00' ou listas de
+    'HH:MM'; o formato único agora é lista de inteiros (minutos).
+    """
+    from .disponibilidade import normalizar_dias, normalizar_horarios
+    from .models import ConfiguracaoAgenda, ExcecaoAgenda
+
+    config = ConfiguracaoAgenda.__table__
+    for id_, dias, horarios in conn.execute(
+        select(config.c.id, config.c.dias_semana, config.c.horarios_base)
+    ).all():
+        novos_dias = normalizar_dias(dias)
+        novos_horarios = normalizar_horarios(horarios)
+
+        if (novos_dias, novos_horarios) != (dias, horarios):
+            conn.execute(
+                update(config).where(config.c.id == id_).values(
+                    dias_semana=novos_dias,
+                    horarios_base=novos_horarios
+                )
+            )
+
+    excecao = ExcecaoAgenda.__table__
+    for id_, bloqueados in conn.execute(
+        select(excecao.c.id, excecao.c.horarios_bloqueados)
+    ).all():
+        novos = normalizar_horarios(bloqueados)
+
+        if novos != bloqueados:
+            conn.execute(
+                update(excecao).where(excecao.c.id == id_).values(
+                    horarios_bloqueados=novos
+                )
+            )
+
+
+def _telefones_normalizados(conn):
+    """Agendamentos anteriores à coluna telefone_normalizado."""
+    from .telefones import preencher_telefones
+
+    log.info('Telefones normalizados: %d', preencher_telefones(conn))
+
+
+def _ocupacao_por_dia(conn):
+    """Resumo ocupacao_dia dos agendamentos já existentes."""
+    from .disponibilidade import reconstruir_ocupacao
+
+    log.info('Dias com ocupação: %d', reconstruir_ocupacao(conn))
+
+
+# (nome, função) — aplicadas em ordem e registradas em migracao_aplicada
+MIGRACOES_DADOS = [
+    ('0001_horarios_em_minutos', _horarios_em_minutos),
+    ('0002_telefones_normalizados', _telefones_normalizados),
+    ('0003_ocupacao_por_dia', _ocupacao_por_dia),
+]
+
+
+def _aplicar_migracoes_dados(db):
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE IF NOT EXISTS migracao_aplicada ('
+            'nome VARCHAR(120) PRIMARY KEY, aplicada_em TIMESTAMP)'
+        ))
+        aplicadas = set(conn.execute(
+            text('SELECT nome FROM migracao_aplicada')
+        ).scalars())
+
+    for nome, funcao in MIGRACOES_DADOS:
+        if nome in aplicadas:
+            continue
+
+        # migração e registro na mesma transação
+        with db.engine.begin() as conn:
+            funcao(conn)
+            conn.execute(
+                text('INSERT INTO migracao_aplicada (nome, aplicada_em) VALUES (:nome, :agora)'),
+                {'nome': nome, 'agora': datetime.utcnow()}
+            )
+        log.info('Migração de dados aplicada: %s', nome)
+
+
+def atualizar_schema(db):
+    """Aplica as alterações pendentes. Pode ser executado várias vezes."""
+    inspetor = inspect(db.engine)
+    tabelas = set(inspetor.get_table_names())
+
+    with db.engine.begin() as conn:
+        for tabela, coluna, tipo in COLUNAS_NOVAS:
+            if tabela not in tabelas:
+                continue
+
+            existentes = {c['name'] for c in inspetor.get_columns(tabela)}
+            if coluna not in existentes:
+                conn.execute(text(
+                    f'ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}'
+                ))
+
+    for nome, tabela, colunas, unico in INDICES:
+        if tabela not in tabelas:
+            continue
+
+        # uma transação por índice: no Postgres um erro aborta a transação
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    f'CREATE {"UNIQUE " if unico else ""}INDEX IF NOT EXISTS '
+                    f'{nome} ON {tabela} ({", ".join(colunas)})'
+                ))
+        except DBAPIError:
+            # ex: agendamentos duplicados impedem o índice único
+            log.warning(
+                'Não foi possível criar o índice %s; verifique registros '
+                'duplicados em %s.', nome, tabela
+            )
+
+    with db.engine.begin() as conn:
+        for nome in INDICES_REMOVIDOS:
+            conn.execute(text(f'DROP INDEX IF EXISTS {nome}'))
+
+    _aplicar_migracoes_dados(db)
@@ -1,5 +1,8 @@
 from datetime import datetime
+from functools import lru_cache
+
 from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
@@ -26,17 +29,26 @@ class Usuario(db.Model):
     fonte_titulo = db.Column(db.String(30), default='padrao')
     tema = db.Column(db.String(30), default='principal')
 
+    # incrementada quando serviços ou identidade mudam; invalida o
+    # cache da página pública /agenda/<slug>
+    versao_vitrine = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0'
+    )
+
     # relacionamentos
+    # o lado "muitos-para-um" (ex: agendamento.usuario) não carrega sob
+    # demanda: as rotas pedem joinedload/selectinload explicitamente,
+    # evitando uma query por linha nas listas
     agendamentos = db.relationship(
         'Agendamento',
-        backref='usuario',
+        backref=db.backref('usuario', lazy='raise_on_sql'),
         lazy=True,
         cascade='all, delete-orphan'
     )
 
     servicos = db.relationship(
         'Servico',
-        backref='usuario',
+        backref=db.backref('usuario', lazy='raise_on_sql'),
         lazy=True,
         cascade='all, delete-orphan'
     )
@@ -50,18 +62,37 @@ class Usuario(db.Model):
 
     excecoes_agenda = db.relationship(
         'ExcecaoAgenda',
-        backref='usuario',
+        backref=db.backref('usuario', lazy='raise_on_sql'),
         lazy=True,
         cascade='all, delete-orphan'
     )
 
     # métodos de senha
-    def set_password(self, senha):
-        self.password_hash = generate_password_hash(senha)
+    def set_password(self, senha, metodo=None):
+        # `metodo` explícito permite gerar o hash fora do contexto do app
+        self.password_hash = generate_password_hash(
+            senha, method=metodo or current_app.config['PASSWORD_HASH_METHOD']
+        )
 
     def check_password(self, senha):
         return check_password_hash(self.password_hash, senha)
 
+    def precisa_rehash(self):
+        # hash do werkzeug: "<método>$<salt>$<hash>"
+        metodo = self.password_hash.split('$', 1)[0]
+        return metodo != metodo_de_hash(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+@lru_cache(maxsize=None)
+def metodo_de_hash(metodo):
+    """
+    Prefixo que o werkzeug grava para o método configurado, que ele
+    completa com os parâmetros padrão ('scrypt' -> 'scrypt:32768:8:1',
+    'pbkdf2:sha256' -> 'pbkdf2:sha256:1000000'). Calculado com um único
+    hash de prova por processo.
+    """
+    return generate_password_hash('', method=metodo).split('$', 1)[0]
+
 
 # =========================
 # AGENDAMENTO
@@ -79,12 +110,98 @@ class Agendamento(db.Model):
 
     nome = db.Column(db.String(100), nullable=False)
     telefone = db.Column(db.String(20), nullable=False)
+    # chave de busca do cliente ('+5511999990000'), ver telefones.py
+    telefone_normalizado = db.Column(db.String(16), nullable=True)
 
     data = db.Column(db.Date, nullable=False)
     horario = db.Column(db.Time, nullable=False)
 
+    # serviço agendado e sua duração no momento do agendamento
+    # (nulos em agendamentos antigos)
+    servico_id = db.Column(
+        db.Integer,
+        db.ForeignKey('servico.id', ondelete='SET NULL'),
+        nullable=True
+    )
+    duracao_minutos = db.Column(db.Integer, nullable=True)
+
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
 
+    servico = db.relationship('Servico', lazy='raise_on_sql')
+
+    __table_args__ = (
+        # um único agendamento por horário; também atende as buscas
+        # por (usuario_id, data) pelo prefixo do índice
+        db.Index(
+            'uq_agendamento_usuario_data_horario',
+            'usuario_id', 'data', 'horario',
+            unique=True
+        ),
+        # consulta do cliente pelo telefone (geral e por agenda), já
+        # na ordem por data para filtrar os próximos agendamentos
+        db.Index(
+            'ix_agendamento_telefone_norm_data',
+            'telefone_normalizado', 'data'
+        ),
+        db.Index(
+            'ix_agendamento_usuario_telefone_norm_data',
+            'usuario_id', 'telefone_normalizado', 'data'
+        ),
+    )
+
+
+class AgendamentoArquivo(db.Model):
+    """
+    Agendamentos de meses passados, movidos de `agendamento` por
+    arquivo.arquivar_agendamentos() (mesmo id e colunas). Só recebe
+    INSERTs em lote: no Postgres é particionada por mês (partições
+    criadas pelo próprio arquivamento); no SQLite é uma tabela
+    WITHOUT ROWID ordenada pela chave (usuario_id, data, id).
+    """
+    __tablename__ = 'agendamento_arquivo'
+
+    # data na chave: exigência do particionamento por data no Postgres
+    usuario_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuario.id'),
+        primary_key=True
+    )
+    data = db.Column(db.Date, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    nome = db.Column(db.String(100), nullable=False)
+    telefone = db.Column(db.String(20), nullable=False)
+    telefone_normalizado = db.Column(db.String(16), nullable=True)
+
+    horario = db.Column(db.Time, nullable=False)
+
+    servico_id = db.Column(
+        db.Integer,
+        db.ForeignKey('servico.id', ondelete='SET NULL'),
+        nullable=True
+    )
+    duracao_minutos = db.Column(db.Integer, nullable=True)
+
+    criado_em = db.Column(db.DateTime)
+
+    usuario = db.relationship('Usuario', lazy='raise_on_sql')
+    servico = db.relationship('Servico', lazy='raise_on_sql')
+
+    # nas telas: arquivados não podem ser cancelados
+    arquivado = True
+
+    __table_args__ = (
+        # histórico do cliente (consultar com "incluir passados")
+        db.Index(
+            'ix_agendamento_arquivo_telefone_norm_data',
+            'telefone_normalizado', 'data'
+        ),
+        {
+            'postgresql_partition_by': 'RANGE (data)',
+            'sqlite_with_rowid': False,
+        },
+    )
+
 
 # =========================
 # SERVIÇOS
@@ -170,7 +287,7 @@ class ConfiguracaoAgenda(db.Model):
     # dias da semana permitidos (0=segunda … 6=domingo)
     dias_semana = db.Column(db.JSON, nullable=False)
 
-    # horários base disponíveis (ex: ["08:00","09:00"])
+    # horários base em minutos desde 00:00 (ex: [480, 540] = 08:00, 09:00)
     horarios_base = db.Column(db.JSON, nullable=False)
 
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -195,7 +312,7 @@ class ExcecaoAgenda(db.Model):
     # dia ativo ou totalmente bloqueado
     dia_ativo = db.Column(db.Boolean, default=True)
 
-    # horários bloqueados especificamente nesse dia
+    # horários bloqueados especificamente nesse dia (em minutos)
     horarios_bloqueados = db.Column(db.JSON, default=list)
 
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -203,3 +320,103 @@ class ExcecaoAgenda(db.Model):
     __table_args__ = (
         db.UniqueConstraint('usuario_id', 'data'),
     )
+
+
+# =========================
+# RESUMO DE OCUPAÇÃO (POR DIA)
+# =========================
+class OcupacaoDia(db.Model):
+    """
+    Resumo materializado dos dias com agendamentos, mantido por
+    disponibilidade.atualizar_ocupacao() na mesma transação das
+    gravações. Dias sem linha não têm agendamentos.
+    """
+    __tablename__ = 'ocupacao_dia'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    usuario_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuario.id'),
+        nullable=False
+    )
+
+    data = db.Column(db.Date, nullable=False)
+
+    # bitmap de 1440 bits (um por minuto) dos minutos agendados
+    minutos_ocupados = db.Column(db.LargeBinary, nullable=False)
+
+    # horários base ainda livres no dia e se não resta nenhum
+    livres = db.Column(db.Integer, nullable=False)
+    lotado = db.Column(db.Boolean, nullable=False)
+
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'data'),
+    )
+
+
+# =========================
+# RESERVA TEMPORÁRIA DE HORÁRIO
+# =========================
+class ReservaHorario(db.Model):
+    """
+    Horário segurado entre /confirmar_agendamento e /salvar_agendamento.
+    Vale até expira_em; as vencidas são ignoradas nas consultas e
+    apagadas na próxima reserva da mesma agenda.
+    """
+    __tablename__ = 'reserva_horario'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    usuario_id = db.Column(
+        db.Integer,
+        db.ForeignKey('usuario.id'),
+        nullable=False
+    )
+
+    data = db.Column(db.Date, nullable=False)
+
+    # início e duração em minutos, como no resumo de ocupação
+    inicio = db.Column(db.Integer, nullable=False)
+    duracao = db.Column(db.Integer, nullable=False)
+
+    token = db.Column(db.String(32), nullable=False, unique=True)
+    expira_em = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_reserva_horario_usuario_data', 'usuario_id', 'data'),
+    )
+
+
+# =========================
+# OUTBOX (EFEITOS COLATERAIS ASSÍNCRONOS)
+# =========================
+class EventoOutbox(db.Model):
+    """
+    Evento gravado na mesma transação da alteração que o originou e
+    processado depois pelo `flask outbox-worker` (ver outbox.py).
+    """
+    __tablename__ = 'evento_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    tipo = db.Column(db.String(60), nullable=False)
+    usuario_id = db.Column(db.Integer, nullable=True)
+    dados = db.Column(db.JSON, nullable=False, default=dict)
+
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # próxima tentativa (também usado como reserva pelo worker)
+    disponivel_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    ultimo_erro = db.Column(db.Text, nullable=True)
+
+    # nulo enquanto pendente
+    processado_em = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # busca dos pendentes prontos para processar
+        db.Index('ix_evento_outbox_pendentes', 'processado_em', 'disponivel_em'),
+    )
@@ -0,0 +1,209 @@
+"""
+Outbox transacional para os efeitos colaterais dos agendamentos.
+
+As rotas só chamam registrar_evento() antes do commit: o evento entra na
+mesma transação do INSERT/DELETE do agendamento, então nunca existe
+evento de agendamento que não foi gravado (nem o contrário). Um processo
+separado consome a tabela em lotes:
+
+    flask outbox-worker
+
+Cada evento é entregue pelo menos uma vez: falhas voltam com espera
+exponencial (OUTBOX_BACKOFF * 2^tentativas) até OUTBOX_MAX_TENTATIVAS,
+e então ficam pendentes com o último erro para inspeção. Tratadores
+precisam tolerar repetição (o id do evento vai junto).
+"""
+import json
+import logging
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from config import Config
+from .models import db, EventoOutbox
+
+log = logging.getLogger(__name__)
+
+# espera máxima entre tentativas, qualquer que seja o número delas
+MAX_BACKOFF = 3600
+
+# {tipo: [funções(evento)]}
+_tratadores = {}
+
+
+# =========================
+# PRODUÇÃO (DENTRO DA TRANSAÇÃO DA ROTA)
+# =========================
+def registrar_evento(tipo, usuario_id=None, **dados):
+    """Adiciona o evento à sessão atual. Não faz commit."""
+    db.session.add(EventoOutbox(
+        tipo=tipo,
+        usuario_id=usuario_id,
+        dados=dados,
+        disponivel_em=datetime.utcnow()
+    ))
+
+
+def dados_agendamento(agendamento, servico=None):
+    """Campos do agendamento que acompanham os eventos."""
+    return {
+        'agendamento_id': agendamento.id,
+        'servico_id': agendamento.servico_id,
+        'servico': servico.titulo if servico else None,
+        'nome': agendamento.nome,
+        'telefone': agendamento.telefone_normalizado or agendamento.telefone,
+        'data': agendamento.data.isoformat(),
+        'horario': agendamento.horario.strftime('%H:%M'),
+    }
+
+
+# =========================
+# TRATADORES
+# =========================
+def tratador(*tipos):
+    """Registra a função para os tipos de evento informados."""
+    def registrar(funcao):
+        for tipo in tipos:
+            _tratadores.setdefault(tipo, []).append(funcao)
+        return funcao
+    return registrar
+
+
+@tratador('agendamento_criado', 'agendamento_cancelado')
+def enviar_webhook(evento):
+    if not Config.OUTBOX_WEBHOOK_URL:
+        return
+
+    corpo = json.dumps({
+        'id': evento.id,
+        'tipo': evento.tipo,
+        'usuario_id': evento.usuario_id,
+        'criado_em': evento.criado_em.isoformat(),
+        'dados': evento.dados,
+    }).encode()
+
+    requisicao = urllib.request.Request(
+        Config.OUTBOX_WEBHOOK_URL,
+        data=corpo,
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    # status >= 400 lança HTTPError e o evento volta para nova tentativa
+    with urllib.request.urlopen(requisicao, timeout=Config.OUTBOX_WEBHOOK_TIMEOUT):
+        pass
+
+
+# =========================
+# CONSUMO (flask outbox-worker)
+# =========================
+def _espera(tentativas):
+    return min(Config.OUTBOX_BACKOFF * 2 ** (tentativas - 1), MAX_BACKOFF)
+
+
+def reservar_lote(limite):
+    """
+    Pega até `limite` eventos prontos e os reserva por OUTBOX_RESERVA
+    segundos (contando uma tentativa). O UPDATE só vale para eventos
+    ainda disponíveis, então dois workers nunca reservam o mesmo.
+    """
+    agora = datetime.utcnow()
+
+    consulta = select(EventoOutbox.id).where(
+        EventoOutbox.processado_em.is_(None),
+        EventoOutbox.disponivel_em <= agora,
+        EventoOutbox.tentativas < Config.OUTBOX_MAX_TENTATIVAS
+    ).order_by(EventoOutbox.id).limit(limite)
+
+    if db.engine.dialect.name == 'postgresql':
+        consulta = consulta.with_for_update(skip_locked=True)
+
+    ids = db.session.execute(consulta).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return []
+
+    reservados = db.session.execute(
+        update(EventoOutbox).where(
+            EventoOutbox.id.in_(ids),
+            EventoOutbox.disponivel_em <= agora
+        ).values(
+            disponivel_em=agora + timedelta(seconds=Config.OUTBOX_RESERVA),
+            tentativas=EventoOutbox.tentativas + 1
+        ).returning(EventoOutbox.id),
+        execution_options={'synchronize_session': False}
+    ).scalars().all()
+    db.session.commit()
+
+    return EventoOutbox.query.filter(
+        EventoOutbox.id.in_(reservados)
+    ).order_by(EventoOutbox.id).all()
+
+
+def processar_lote(limite=None):
+    """Processa um lote; retorna (processados, falhas)."""
+    eventos = reservar_lote(limite or Config.OUTBOX_LOTE)
+    falhas = 0
+
+    for evento in eventos:
+        try:
+            for funcao in _tratadores.get(evento.tipo, []):
+                funcao(evento)
+        except Exception as erro:
+            falhas += 1
+            evento.ultimo_erro = f'{type(erro).__name__}: {erro}'[:1000]
+            evento.disponivel_em = datetime.utcnow() + timedelta(
+                seconds=_espera(evento.tentativas)
+            )
+            log.warning(
+                'Evento %s (%s) falhou na tentativa %s: %s',
+                evento.id, evento.tipo, evento.tentativas, erro
+            )
+        else:
+            evento.processado_em = datetime.utcnow()
+            evento.ultimo_erro = None
+
+    if eventos:
+        db.session.commit()
+
+    return len(eventos) - falhas, falhas
+
+
+def limpar_processados(dias=None):
+    """Apaga eventos processados há mais de `dias` dias."""
+    limite = datetime.utcnow() - timedelta(
+        days=dias if dias is not None else Config.OUTBOX_RETENCAO_DIAS
+    )
+    apagados = db.session.execute(
+        delete(EventoOutbox).where(EventoOutbox.processado_em < limite),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+    db.session.commit()
+    return apagados
+
+
+def executar_worker(intervalo=1.0, uma_vez=False):
+    """
+    Laço do worker: processa lotes enquanto houver eventos prontos e
+    dorme `intervalo` segundos quando a fila esvazia.
+    """
+    ultima_limpeza = 0
+
+    while True:
+        processados, falhas = processar_lote()
+        db.session.remove()
+
+        if processados or falhas:
+            log.info('Outbox: %d processados, %d falhas', processados, falhas)
+            continue
+
+        if time.monotonic() - ultima_limpeza > 3600:
+            limpar_processados()
+            db.session.remove()
+            ultima_limpeza = time.monotonic()
+
+        if uma_vez:
+            return
+
+        time.sleep(intervalo)
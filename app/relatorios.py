@@ -0,0 +1,102 @@
+from datetime import date
+
+from sqlalchemy import func, select
+
+from config import Config
+from .arquivo import com_arquivo
+from .cache import criar_cache
+from .models import db, Agendamento, AgendamentoArquivo, Servico
+
+MESES = [
+    "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+    "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
+]
+
+DIAS_SEMANA = [
+    "Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado", "Domingo"
+]
+
+# {usuario_id: {'<ano>': relatorio}}, compartilhado entre os workers
+# com CACHE_URL: por isso só valores JSON (ano como texto, receita float)
+_cache = criar_cache('relatorio', ttl=Config.CACHE_RELATORIO_TTL)
+
+
+def invalidar_relatorio(usuario_id):
+    """Chamado sempre que os agendamentos (ou preços) do usuário mudam."""
+    _cache.delete(usuario_id)
+
+
+def gerar_relatorio(usuario_id, ano):
+    por_ano = _cache.get(usuario_id) or {}
+    chave = str(ano)
+
+    if chave not in por_ano:
+        por_ano = dict(por_ano)
+        por_ano[chave] = _calcular(usuario_id, ano)
+        _cache.set(usuario_id, por_ano)
+
+    return por_ano[chave]
+
+
+def _contagem(tabela, usuario_id):
+    return select(func.count()).select_from(tabela).where(
+        tabela.c.usuario_id == usuario_id
+    ).scalar_subquery()
+
+
+def _calcular(usuario_id, ano):
+    inicio = date(ano, 1, 1)
+
+    # total geral: contagem pelo índice (usuario_id, ...) de cada
+    # tabela, somadas na mesma query
+    total_geral = db.session.scalar(select(
+        _contagem(Agendamento.__table__, usuario_id)
+        + _contagem(AgendamentoArquivo.__table__, usuario_id)
+    ))
+
+    # uma única query agrupada por dia no intervalo do ano (incluindo
+    # os arquivados); meses e dias da semana são somados a partir dela
+    # (no máximo 366 linhas)
+    dias = com_arquivo(lambda tabela: select(
+        tabela.c.data,
+        tabela.c.servico_id
+    ).where(
+        tabela.c.usuario_id == usuario_id,
+        tabela.c.data >= inicio,
+        tabela.c.data < date(ano + 1, 1, 1)
+    ), inicio).subquery()
+
+    linhas = db.session.execute(select(
+        dias.c.data,
+        func.count(),
+        func.coalesce(func.sum(Servico.preco), 0)
+    ).outerjoin(
+        Servico, dias.c.servico_id == Servico.id
+    ).group_by(
+        dias.c.data
+    )).all()
+
+    por_mes = [{'nome': nome, 'total': 0, 'receita': 0} for nome in MESES]
+    por_dia_semana = [{'nome': nome, 'total': 0, 'receita': 0} for nome in DIAS_SEMANA]
+
+    for data, total, receita in linhas:
+        for grupo in (por_mes[data.month - 1], por_dia_semana[data.weekday()]):
+            grupo['total'] += total
+            grupo['receita'] += receita
+
+    pico = max(por_mes, key=lambda m: m['total'])
+    receita_no_ano = sum(m['receita'] for m in por_mes)
+
+    # somas em Decimal; float só no resultado, que vai para o cache
+    for grupo in por_mes + por_dia_semana:
+        grupo['receita'] = float(grupo['receita'])
+
+    return {
+        'ano': ano,
+        'total_agendamentos': total_geral,
+        'total_no_ano': sum(m['total'] for m in por_mes),
+        'receita_no_ano': float(receita_no_ano),
+        'melhor_mes': pico['nome'] if pico['total'] else None,
+        'por_mes': por_mes,
+        'por_dia_semana': por_dia_semana,
+    }
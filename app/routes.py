@@ -1,11 +1,32 @@
-from flask import Blueprint, render_template, request, redirect, flash, url_for, jsonify, session
+from flask import Blueprint, Response, render_template, stream_with_context, request, redirect, flash, url_for, jsonify, session
+import csv
+import hashlib
 from functools import wraps
-from datetime import datetime
-from sqlalchemy import extract, func
+from datetime import MAXYEAR, MINYEAR, datetime, timedelta
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
 
+from config import Config
 from . import db
+from .arquivo import modelos_periodo
+from .cache import criar_cache
 from .models import Agendamento
 from app.models import Servico, Usuario, ConfiguracaoAgenda, ExcecaoAgenda
+from .disponibilidade import (
+    atualizar_ocupacao, consumir_reserva, criar_reserva, dados_verificacao,
+    expandir_excecoes, horarios_livres_gravacao, horarios_livres_periodo,
+    invalidar_agenda, normalizar_dias, normalizar_horarios, para_minutos,
+    periodo_consulta, proximo_dia_livre, recalcular_ocupacao,
+    salvar_excecoes, travar_agenda
+)
+from .outbox import dados_agendamento, registrar_evento
+from .relatorios import gerar_relatorio, invalidar_relatorio
+from .telefones import normalizar_telefone, telefone_ou_none
+from .transferencia import (
+    exportar_csv, exportar_ndjson, importar_agendamentos, importar_servicos,
+    ler_linhas
+)
 
 main = Blueprint('main', __name__)
 
@@ -31,8 +52,10 @@ def home():
 
 @main.route('/agendar/<int:servico_id>')
 def agendar_por_id(servico_id):
-    servico = Servico.query.get_or_404(servico_id)
-    usuario = Usuario.query.get_or_404(servico.usuario_id)
+    servico = Servico.query.options(
+        joinedload(Servico.usuario)
+    ).filter_by(id=servico_id).first_or_404()
+    usuario = servico.usuario
 
     return render_template(
         'agendar_servico.html',
@@ -52,23 +75,37 @@ def confirmar_agendamento():
 
     servico = Servico.query.get_or_404(int(servico_id))
     data_obj = datetime.strptime(data_str, '%Y-%m-%d').date()
-    hora_obj = datetime.strptime(hora_str, '%H:%M').time()
 
-    existe = Agendamento.query.filter_by(
-        data=data_obj,
-        horario=hora_obj,
-        usuario_id=servico.usuario_id
-    ).first()
+    # a reserva anterior deste cliente deixa de valer
+    anterior = session.get('reserva')
+
+    # verificação e reserva atômicas, como no salvar_agendamento
+    travar_agenda(servico.usuario_id)
+
+    livres = horarios_livres_gravacao(
+        servico.usuario_id, data_obj, servico.duracao_minutos,
+        reserva=anterior
+    )
 
-    if existe:
+    if hora_str not in livres:
+        db.session.rollback()
         return "Horário já agendado. Volte e escolha outro.", 409
 
+    token = criar_reserva(
+        servico.usuario_id, data_obj, para_minutos(hora_str),
+        servico.duracao_minutos, substituir=anterior
+    )
+    db.session.commit()
+    session['reserva'] = token
+
     return render_template(
         'confirmar_dados.html',
         servico=servico.titulo,
         data=data_str,
         hora=hora_str,
-        servico_id=servico.id
+        servico_id=servico.id,
+        reserva=token,
+        reserva_minutos=Config.RESERVA_TTL // 60
     )
 
 
@@ -77,21 +114,68 @@ def salvar_agendamento():
     nome = request.form['nome']
     telefone = request.form['telefone']
     data = datetime.strptime(request.form['data'], '%Y-%m-%d').date()
+
+    try:
+        telefone_normalizado = normalizar_telefone(telefone)
+    except ValueError:
+        return "Telefone inválido. Volte e informe DDD e número.", 400
+
     hora = datetime.strptime(request.form['hora'], '%H:%M').time()
 
     sid = request.form.get('servico_id')
-    servico = Servico.query.get_or_404(int(sid))
+    servico = Servico.query.options(
+        joinedload(Servico.usuario)
+    ).filter_by(id=int(sid)).first_or_404()
+
+    # reserva feita na confirmação (vencida ou ausente: vale a
+    # disponibilidade no momento)
+    reserva = request.form.get('reserva') or session.get('reserva')
+
+    # verificação e gravação na mesma transação, com a agenda travada
+    travar_agenda(servico.usuario_id)
+
+    livres = horarios_livres_gravacao(
+        servico.usuario_id, data, servico.duracao_minutos, reserva=reserva
+    )
+
+    if hora.strftime('%H:%M') not in livres:
+        db.session.rollback()
+        return "Horário já agendado. Volte e escolha outro.", 409
+
+    consumir_reserva(reserva)
 
     novo = Agendamento(
         usuario_id=servico.usuario_id,
+        servico_id=servico.id,
+        duracao_minutos=servico.duracao_minutos,
         nome=nome,
         telefone=telefone,
+        telefone_normalizado=telefone_normalizado,
         data=data,
         horario=hora
     )
 
     db.session.add(novo)
-    db.session.commit()
+
+    try:
+        # o INSERT sai no flush: a violação do índice único pode vir daqui
+        db.session.flush()
+        atualizar_ocupacao(servico.usuario_id, [data])
+
+        # avisos e integrações saem pelo outbox, fora desta requisição
+        registrar_evento(
+            'agendamento_criado', servico.usuario_id,
+            **dados_agendamento(novo, servico)
+        )
+
+        db.session.commit()
+    except IntegrityError:
+        # índice único (usuario_id, data, horario) como última garantia
+        db.session.rollback()
+        return "Horário já agendado. Volte e escolha outro.", 409
+
+    session.pop('reserva', None)
+    invalidar_relatorio(servico.usuario_id)
 
     slug = servico.usuario.slug
 
@@ -110,143 +194,123 @@ def salvar_agendamento():
 # =========================
 @main.route('/horarios_disponiveis', methods=['POST'])
 def horarios_disponiveis():
-    data_str = request.json.get('data')
-    usuario_id = request.json.get('usuario_id')
-
-    if not data_str or not usuario_id:
-        return jsonify([])
-
-    data = datetime.strptime(data_str, '%Y-%m-%d').date()
-    dia_semana = data.weekday()  # 0 = segunda
+    """Rota antiga (sem serviço): cada horário ocupa um horário base."""
+    dados = request.get_json(silent=True) or {}
+    data_str = dados.get('data')
 
-    config = ConfiguracaoAgenda.query.filter_by(
-        usuario_id=usuario_id
-    ).first()
-
-    if not config:
-        return jsonify([])
+    try:
+        usuario_id = int(dados.get('usuario_id'))
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'usuario_id inválido'}), 400
 
-    dias_permitidos = [int(d) for d in config.dias_semana.split(',')]
-    if dia_semana not in dias_permitidos:
+    if not data_str:
         return jsonify([])
 
-    horarios = config.horarios_base.split(',')
-
-    excecao = ExcecaoAgenda.query.filter_by(
-        usuario_id=usuario_id,
-        data=data
-    ).first()
-
-    if excecao:
-        if not excecao.dia_ativo:
-            return jsonify([])
+    try:
+        data = datetime.strptime(data_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return jsonify({'erro': 'Data inválida (AAAA-MM-DD)'}), 400
 
-        if excecao.horarios_desativados:
-            bloqueados = excecao.horarios_desativados.split(',')
-            horarios = [h for h in horarios if h not in bloqueados]
+    livres = horarios_livres_periodo(usuario_id, data, data)
 
-    return jsonify(horarios)
+    return jsonify(livres[data])
 
 
 @main.route('/verificar_horarios', methods=['POST'])
 def verificar_horarios():
-    data_json = request.get_json()
-    data_str = data_json.get('data')
-    servico_id = data_json.get('servico_id')
+    # mesma validação do app ASGI (assincrono.py)
+    try:
+        dados = dados_verificacao(request.get_json(silent=True))
+    except ValueError as erro:
+        return jsonify({'erro': str(erro)}), 400
 
-    if not data_str or not servico_id:
+    if dados is None:
         return jsonify([])
 
-    data = datetime.strptime(data_str, '%Y-%m-%d').date()
-    dia_semana = data.weekday()  # 0 = segunda, 6 = domingo
+    servico_id, data = dados
 
     # serviço e usuário
-    servico = Servico.query.get_or_404(servico_id)
-    usuario_id = servico.usuario_id
-
-    # configuração base
-    config = ConfiguracaoAgenda.query.filter_by(
-        usuario_id=usuario_id
-    ).first()
-
-    if not config:
-        return jsonify([])
+    servico = db.session.get(Servico, servico_id)
+    if servico is None:
+        return jsonify({'erro': 'Serviço não encontrado'}), 404
+
+    # a reserva do próprio cliente não esconde o horário dele
+    livres = horarios_livres_periodo(
+        servico.usuario_id, data, data, servico.duracao_minutos,
+        reserva=session.get('reserva')
+    )
 
-    # ✅ AGORA É LISTA, NÃO STRING
-    dias_permitidos = config.dias_semana
-    horarios_base = config.horarios_base
+    return jsonify(livres[data])
 
-    # dia não permitido
-    if dia_semana not in dias_permitidos:
-        return jsonify([])
 
-    # exceção por data
-    excecao = ExcecaoAgenda.query.filter_by(
-        usuario_id=usuario_id,
-        data=data
-    ).first()
+@main.route('/disponibilidade/<int:servico_id>')
+def disponibilidade(servico_id):
+    """
+    Disponibilidade de um período inteiro em uma única chamada.
+    Ex: /disponibilidade/3?de=2025-01-01&ate=2025-01-31
+    """
+    servico = Servico.query.get_or_404(servico_id)
 
-    if excecao:
-        if not excecao.dia_ativo:
-            return jsonify([])
+    try:
+        inicio, fim = periodo_consulta(
+            request.args.get('de'), request.args.get('ate')
+        )
+    except ValueError:
+        return jsonify({'erro': 'Informe o período em de/ate (AAAA-MM-DD)'}), 400
 
-        horarios_base = [
-            h for h in horarios_base
-            if h not in (excecao.horarios_bloqueados or [])
-        ]
+    livres = horarios_livres_periodo(
+        servico.usuario_id, inicio, fim, servico.duracao_minutos
+    )
 
-    # horários já agendados
-    agendados = Agendamento.query.filter_by(
-        usuario_id=usuario_id,
-        data=data
-    ).all()
+    return jsonify({
+        'servico_id': servico.id,
+        'de': inicio.isoformat(),
+        'ate': fim.isoformat(),
+        'dias': {
+            dia.isoformat(): horarios
+            for dia, horarios in livres.items()
+        }
+    })
+
+@main.route('/disponibilidade/<int:servico_id>/proximo')
+def proximo_disponivel(servico_id):
+    """Primeiro dia com horário para o serviço (?de=AAAA-MM-DD, padrão hoje)."""
+    servico = Servico.query.get_or_404(servico_id)
 
-    horarios_ocupados = {a.horario.strftime('%H:%M') for a in agendados}
+    try:
+        inicio = (
+            datetime.strptime(request.args['de'], '%Y-%m-%d').date()
+            if request.args.get('de') else datetime.now().date()
+        )
+    except ValueError:
+        return jsonify({'erro': 'Data inválida (AAAA-MM-DD)'}), 400
 
-    # horários finais disponíveis
-    horarios_disponiveis = [
-        h for h in horarios_base
-        if h not in horarios_ocupados
-    ]
+    dia, horarios = proximo_dia_livre(
+        servico.usuario_id, inicio, servico.duracao_minutos
+    )
 
-    return jsonify(horarios_disponiveis)
+    return jsonify({
+        'servico_id': servico.id,
+        'data': dia.isoformat() if dia else None,
+        'horarios': horarios,
+    })
 
 @main.route('/relatorio')
+@login_required
 def relatorio():
-    # Total de agendamentos
-    total_agendamentos = Agendamento.query.count()
-
-    # Melhor mês do ano (mês com mais agendamentos)
-    dados_por_mes = (
-        db.session.query(
-            extract('month', Agendamento.data).label('mes'),
-            func.count(Agendamento.id).label('total')
-        )
-        .group_by('mes')
-        .order_by(func.count(Agendamento.id).desc())
-        .all()
-    )
-    melhor_mes = None
-    if dados_por_mes:
-        meses_nomes = [
-            "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
-            "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"
-        ]
-        melhor_mes = meses_nomes[int(dados_por_mes[0].mes) - 1]
+    ano = request.args.get('ano', datetime.now().year, type=int)
 
-    # Total de cancelados (considerando que há um campo status='cancelado')
-    total_cancelados = Agendamento.query.filter_by(status='cancelado').count() if hasattr(Agendamento, 'status') else 0
+    # o relatório vai até 1º de janeiro do ano seguinte
+    if not MINYEAR <= ano < MAXYEAR:
+        return "Ano inválido.", 400
 
-    # Total de agendamentos no ano atual
-    ano_atual = datetime.now().year
-    total_no_ano = Agendamento.query.filter(extract('year', Agendamento.data) == ano_atual).count()
+    dados = gerar_relatorio(session['user_id'], ano)
 
     return render_template(
         'relatorio.html',
-        total_agendamentos=total_agendamentos,
-        melhor_mes=melhor_mes,
-        total_cancelados=total_cancelados,
-        total_no_ano=total_no_ano
+        # cancelar() remove o agendamento, então não há cancelados salvos
+        total_cancelados=0,
+        **dados
     )
 
 @main.route("/lista")
@@ -264,20 +328,73 @@ def eventos():
 # =========================
 # CONSULTAS / CANCELAMENTO
 # =========================
+# resultados por consulta do cliente
+CONSULTA_LIMITE = 50
+
+
+def _agendamentos_cliente(telefone, usuario_id=None, historico=False):
+    """
+    Agendamentos do telefone (em qualquer formato), pelo índice de
+    (usuario_id, telefone_normalizado, data). Por padrão só os de hoje
+    em diante; historico=True inclui os passados, arquivados ou não.
+    Os próximos vêm primeiro, por data; depois os passados, do mais
+    recente ao mais antigo, até completar CONSULTA_LIMITE.
+    """
+    normalizado = telefone_ou_none(telefone)
+    if normalizado is None:
+        return []
+
+    hoje = datetime.now().date()
+
+    def consulta(modelo):
+        consulta = modelo.query.options(
+            joinedload(modelo.usuario),
+            joinedload(modelo.servico)
+        ).filter(
+            modelo.telefone_normalizado == normalizado
+        )
+
+        if usuario_id is not None:
+            consulta = consulta.filter(modelo.usuario_id == usuario_id)
+
+        return consulta
+
+    # nada de hoje em diante é arquivado
+    proximos = consulta(Agendamento).filter(
+        Agendamento.data >= hoje
+    ).order_by(
+        Agendamento.data,
+        Agendamento.horario
+    ).limit(CONSULTA_LIMITE).all()
+
+    restantes = CONSULTA_LIMITE - len(proximos)
+    if not historico or not restantes:
+        return proximos
+
+    passados = []
+    for modelo in modelos_periodo(None):
+        passados += consulta(modelo).filter(
+            modelo.data < hoje
+        ).order_by(
+            modelo.data.desc(),
+            modelo.horario.desc()
+        ).limit(restantes).all()
+
+    passados.sort(key=lambda ag: (ag.data, ag.horario), reverse=True)
+    return proximos + passados[:restantes]
+
+
 @main.route('/consultar', methods=['GET', 'POST'])
 def consultar():
     agendamentos = None
     telefone = None
+    historico = False
     slug = None
 
     if request.method == 'POST':
         telefone = request.form['telefone']
-        agendamentos = Agendamento.query.filter_by(
-            telefone=telefone
-        ).order_by(
-            Agendamento.data,
-            Agendamento.horario
-        ).all()
+        historico = bool(request.form.get('historico'))
+        agendamentos = _agendamentos_cliente(telefone, historico=historico)
 
         if agendamentos:
             slug = agendamentos[0].usuario.slug
@@ -286,18 +403,32 @@ def consultar():
         'consultar.html',
         agendamentos=agendamentos,
         telefone=telefone,
+        historico=historico,
         slug=slug
     )
 
 
 @main.route('/cancelar/<int:id>', methods=['POST'])
 def cancelar(id):
-    agendamento = Agendamento.query.get_or_404(id)
-    telefone = agendamento.telefone
+    agendamento = Agendamento.query.options(
+        joinedload(Agendamento.servico)
+    ).filter_by(id=id).first_or_404()
+    usuario_id = agendamento.usuario_id
+    data = agendamento.data
+
+    registrar_evento(
+        'agendamento_cancelado', usuario_id,
+        **dados_agendamento(agendamento, agendamento.servico)
+    )
 
+    travar_agenda(usuario_id)
     db.session.delete(agendamento)
+    db.session.flush()
+    atualizar_ocupacao(usuario_id, [data])
     db.session.commit()
 
+    invalidar_relatorio(usuario_id)
+
     flash('Agendamento cancelado com sucesso!')
     return redirect(url_for('main.consultar'))
 
@@ -311,31 +442,205 @@ def painel():
     return render_template('painel.html')
 
 
+# janela padrão da lista do admin e tamanho de página
+ADMIN_DIAS_PADRAO = 30
+ADMIN_POR_PAGINA = 50
+ADMIN_MAX_POR_PAGINA = 200
+
+
+def _cursor(agendamento):
+    return '{}_{}_{}'.format(
+        agendamento.data.isoformat(),
+        agendamento.horario.strftime('%H:%M'),
+        agendamento.id
+    )
+
+
+def _pagina_agendamentos(user_id, args):
+    """
+    Paginação por chave (data, horario, id): cada página custa o mesmo,
+    independente de quantos agendamentos o usuário já teve.
+    Retorna (agendamentos, proximo_cursor, inicio, fim).
+    """
+    data_filtro = args.get('data')
+    hoje = datetime.now().date()
+
+    if data_filtro:
+        inicio = fim = datetime.strptime(data_filtro, '%Y-%m-%d').date()
+    else:
+        inicio = datetime.strptime(args['de'], '%Y-%m-%d').date() if args.get('de') else hoje
+        fim = (
+            datetime.strptime(args['ate'], '%Y-%m-%d').date() if args.get('ate')
+            else inicio + timedelta(days=ADMIN_DIAS_PADRAO)
+        )
+
+    # entre 1 e ADMIN_MAX_POR_PAGINA (LIMIT negativo no SQLite não limita)
+    limite = max(1, min(
+        args.get('limite', ADMIN_POR_PAGINA, type=int) or ADMIN_POR_PAGINA,
+        ADMIN_MAX_POR_PAGINA
+    ))
+
+    apos = None
+    if args.get('apos'):
+        data_c, hora_c, id_c = args['apos'].split('_')
+        apos = (
+            datetime.strptime(data_c, '%Y-%m-%d').date(),
+            datetime.strptime(hora_c, '%H:%M').time(),
+            int(id_c)
+        )
+
+    # períodos passados também leem o arquivo; as duas páginas são
+    # intercaladas pela mesma chave
+    agendamentos = []
+    for modelo in modelos_periodo(inicio):
+        query = modelo.query.options(
+            joinedload(modelo.servico)
+        ).filter(
+            modelo.usuario_id == user_id,
+            modelo.data >= inicio,
+            modelo.data <= fim
+        )
+
+        if apos:
+            query = query.filter(
+                tuple_(modelo.data, modelo.horario, modelo.id) > apos
+            )
+
+        agendamentos += query.order_by(
+            modelo.data,
+            modelo.horario,
+            modelo.id
+        ).limit(limite + 1).all()
+
+    agendamentos.sort(key=lambda ag: (ag.data, ag.horario, ag.id))
+
+    proximo = None
+    if len(agendamentos) > limite:
+        agendamentos = agendamentos[:limite]
+        proximo = _cursor(agendamentos[-1])
+
+    return agendamentos, proximo, inicio, fim
+
+
 @main.route('/admin', methods=['GET', 'POST'])
 @login_required
 def admin():
-    data_filtro = request.form.get('data')
-    user_id = session["user_id"]
+    data_filtro = request.values.get('data')
 
-    if data_filtro:
-        try:
-            data_obj = datetime.strptime(data_filtro, '%Y-%m-%d').date()
-            agendamentos = Agendamento.query.filter_by(
-                usuario_id=user_id,
-                data=data_obj
-            ).order_by(Agendamento.horario).all()
-        except:
-            agendamentos = []
-    else:
-        agendamentos = Agendamento.query.filter_by(
-            usuario_id=user_id
-        ).order_by(Agendamento.data, Agendamento.horario).all()
+    try:
+        agendamentos, proximo, inicio, fim = _pagina_agendamentos(
+            session["user_id"], request.values
+        )
+    except ValueError:
+        agendamentos, proximo, inicio, fim = [], None, None, None
 
     return render_template(
         'admin.html',
         agendamentos=agendamentos,
-        data_filtro=data_filtro
+        data_filtro=data_filtro,
+        proximo=proximo,
+        inicio=inicio,
+        fim=fim
+    )
+
+
+@main.route('/admin/agendamentos')
+@login_required
+def admin_agendamentos_json():
+    """Variante JSON do /admin para rolagem infinita (?apos=<proximo>)."""
+    try:
+        agendamentos, proximo, inicio, fim = _pagina_agendamentos(
+            session["user_id"], request.args
+        )
+    except ValueError:
+        return jsonify({'erro': 'Parâmetros inválidos'}), 400
+
+    return jsonify({
+        'de': inicio.isoformat(),
+        'ate': fim.isoformat(),
+        'proximo': proximo,
+        'agendamentos': [
+            {
+                'id': a.id,
+                'nome': a.nome,
+                'telefone': a.telefone,
+                'servico': a.servico.titulo if a.servico else None,
+                'data': a.data.isoformat(),
+                'horario': a.horario.strftime('%H:%M'),
+            }
+            for a in agendamentos
+        ]
+    })
+
+
+# =========================
+# IMPORTAÇÃO / EXPORTAÇÃO
+# =========================
+@main.route('/importar/<tipo>', methods=['POST'])
+@login_required
+def importar(tipo):
+    """Arquivo em 'arquivo' (CSV, NDJSON ou JSON); ver transferencia.py."""
+    user_id = session["user_id"]
+    funcoes = {
+        'agendamentos': importar_agendamentos,
+        'servicos': importar_servicos,
+    }
+
+    if tipo not in funcoes:
+        return jsonify({'erro': 'Tipo inválido'}), 404
+
+    arquivo = request.files.get('arquivo')
+    if not arquivo:
+        return jsonify({'erro': 'Envie o arquivo no campo "arquivo"'}), 400
+
+    try:
+        relatorio = funcoes[tipo](user_id, ler_linhas(arquivo.stream))
+    except (ValueError, csv.Error) as erro:
+        # lotes anteriores ao erro já foram gravados
+        db.session.rollback()
+        return jsonify({'erro': f'Arquivo inválido: {erro}'}), 400
+    finally:
+        invalidar_relatorio(user_id)
+
+    if tipo == 'servicos' and relatorio['inseridos']:
+        _atualizar_vitrine(user_id)
+        db.session.commit()
+
+    return jsonify(relatorio)
+
+
+@main.route('/exportar/agendamentos')
+@login_required
+def exportar_agendamentos():
+    """?formato=csv|ndjson&de=AAAA-MM-DD&ate=AAAA-MM-DD (período opcional)"""
+    user_id = session["user_id"]
+    formato = request.args.get('formato', 'csv')
+
+    try:
+        inicio, fim = (
+            datetime.strptime(request.args[campo], '%Y-%m-%d').date()
+            if request.args.get(campo) else None
+            for campo in ('de', 'ate')
+        )
+    except ValueError:
+        return jsonify({'erro': 'Parâmetros inválidos'}), 400
+
+    if formato == 'csv':
+        gerador, mimetype = exportar_csv, 'text/csv'
+    elif formato == 'ndjson':
+        gerador, mimetype = exportar_ndjson, 'application/x-ndjson'
+    else:
+        return jsonify({'erro': 'Formato inválido'}), 400
+
+    # a sessão do banco precisa continuar aberta enquanto o corpo é enviado
+    resposta = Response(
+        stream_with_context(gerador(user_id, inicio, fim)),
+        mimetype=mimetype
     )
+    resposta.headers['Content-Disposition'] = (
+        f'attachment; filename=agendamentos.{formato}'
+    )
+    return resposta
 
 
 @main.route('/servicos', methods=['GET', 'POST'])
@@ -351,6 +656,7 @@ def servicos():
             tempo=request.form['tempo']
         )
         db.session.add(novo_servico)
+        _atualizar_vitrine(user_id)
         db.session.commit()
         return redirect(url_for('main.servicos'))
 
@@ -375,7 +681,11 @@ def editar_servico(id):
     servico.valor = data.get('valor')
     servico.tempo = data.get('tempo')
 
+    _atualizar_vitrine(servico.usuario_id)
     db.session.commit()
+
+    # a receita do relatório usa o preço do serviço
+    invalidar_relatorio(servico.usuario_id)
     return jsonify({'mensagem': 'Serviço atualizado com sucesso!'})
 
 
@@ -389,19 +699,54 @@ def service():
     return redirect(url_for("main.agenda_publica_slug", slug=usuario.slug))
 
 
+# páginas públicas já renderizadas, por (usuario_id, versao_vitrine)
+_cache_vitrine = criar_cache('vitrine', ttl=Config.CACHE_VITRINE_TTL)
+
+
+def _atualizar_vitrine(usuario_id):
+    """Nova versão da página pública; vai junto no commit da alteração."""
+    Usuario.query.filter_by(id=usuario_id).update({
+        Usuario.versao_vitrine: Usuario.versao_vitrine + 1
+    })
+
+
 @main.route("/agenda/<slug>")
 def agenda_publica_slug(slug):
-    usuario = Usuario.query.filter_by(slug=slug).first_or_404()
+    usuario_id, versao = db.session.query(
+        Usuario.id, Usuario.versao_vitrine
+    ).filter_by(slug=slug).first_or_404()
 
-    servicos = Servico.query.filter_by(
-        usuario_id=usuario.id
-    ).order_by(Servico.titulo).all()
+    chave = f'{usuario_id}:{versao}'
+    pagina = _cache_vitrine.get(chave)
 
-    return render_template(
-        "service.html",
-        servicos=servicos,
-        usuario=usuario
-    )
+    if pagina is None:
+        usuario = db.session.get(Usuario, usuario_id)
+
+        servicos = Servico.query.filter_by(
+            usuario_id=usuario.id
+        ).order_by(Servico.titulo).all()
+
+        html = render_template(
+            "service.html",
+            servicos=servicos,
+            usuario=usuario
+        )
+        pagina = {
+            'etag': hashlib.sha256(html.encode()).hexdigest(),
+            'html': html,
+        }
+        _cache_vitrine.set(chave, pagina)
+
+    # visitantes recorrentes e proxies revalidam e recebem 304
+    # ETag fraco: o mesmo HTML vai comprimido ou não (app/compressao.py)
+    if request.if_none_match.contains_weak(pagina['etag']):
+        resposta = Response(status=304)
+    else:
+        resposta = Response(pagina['html'], mimetype='text/html')
+
+    resposta.set_etag(pagina['etag'], weak=True)
+    resposta.headers['Cache-Control'] = 'public, no-cache'
+    return resposta
 
 
 @main.route('/agenda/<slug>/consultar', methods=['GET', 'POST'])
@@ -410,21 +755,20 @@ def consultar_publico(slug):
 
     agendamentos = None
     telefone = None
+    historico = False
 
     if request.method == 'POST':
         telefone = request.form['telefone']
-        agendamentos = Agendamento.query.filter_by(
-            telefone=telefone,
-            usuario_id=usuario.id
-        ).order_by(
-            Agendamento.data,
-            Agendamento.horario
-        ).all()
+        historico = bool(request.form.get('historico'))
+        agendamentos = _agendamentos_cliente(
+            telefone, usuario_id=usuario.id, historico=historico
+        )
 
     return render_template(
         'consultar.html',
         agendamentos=agendamentos,
         telefone=telefone,
+        historico=historico,
         slug=slug
     )
 
@@ -437,11 +781,17 @@ def salvar_configuracao_agenda():
 
     dias_semana = data.get('dias_semana')           # [0,1,2,3,4]
     horarios_base = data.get('horarios_base')       # ['08:00','09:00']
-    excecoes = data.get('excecoes', [])              # opcional
+    excecoes = data.get('excecoes', [])             # opcional (ver expandir_excecoes)
 
     if not dias_semana or not horarios_base:
         return jsonify({'erro': 'Dados incompletos'}), 400
 
+    try:
+        dias_semana = normalizar_dias(dias_semana)
+        horarios_base = normalizar_horarios(horarios_base)
+    except ValueError:
+        return jsonify({'erro': 'Dias ou horários inválidos'}), 400
+
     # -----------------------------
     # CONFIGURAÇÃO BASE (UPSERT)
     # -----------------------------
@@ -449,48 +799,29 @@ def salvar_configuracao_agenda():
         usuario_id=user_id
     ).first()
 
-    dias_str = ','.join(str(d) for d in dias_semana)
-    horarios_str = ','.join(horarios_base)
-
     if config:
-        config.dias_semana = dias_str
-        config.horarios_base = horarios_str
+        config.dias_semana = dias_semana
+        config.horarios_base = horarios_base
     else:
         config = ConfiguracaoAgenda(
             usuario_id=user_id,
-            dias_semana=dias_str,
-            horarios_base=horarios_str
+            dias_semana=dias_semana,
+            horarios_base=horarios_base
         )
         db.session.add(config)
 
     # -----------------------------
-    # EXCEÇÕES POR DATA
+    # EXCEÇÕES (DATAS, PERÍODOS E REGRAS SEMANAIS)
     # -----------------------------
-    for ex in excecoes:
-        data_ex = datetime.strptime(ex['data'], '%Y-%m-%d').date()
-        dia_ativo = ex.get('dia_ativo', True)
-        horarios_desativados = ex.get('horarios', [])
-
-        excecao = ExcecaoAgenda.query.filter_by(
-            usuario_id=user_id,
-            data=data_ex
-        ).first()
-
-        horarios_str = ','.join(horarios_desativados) if horarios_desativados else None
-
-        if excecao:
-            excecao.dia_ativo = dia_ativo
-            excecao.horarios_desativados = horarios_str
-        else:
-            nova = ExcecaoAgenda(
-                usuario_id=user_id,
-                data=data_ex,
-                dia_ativo=dia_ativo,
-                horarios_desativados=horarios_str
-            )
-            db.session.add(nova)
+    try:
+        salvar_excecoes(user_id, expandir_excecoes(excecoes))
+    except ValueError:
+        db.session.rollback()
+        return jsonify({'erro': 'Exceções inválidas'}), 400
 
+    recalcular_ocupacao(user_id)
     db.session.commit()
+    invalidar_agenda(user_id)
 
     return jsonify({'status': 'ok'})
 
@@ -504,6 +835,12 @@ def configuracoes():
 def salvar_configuracao_base():
     data = request.get_json()
 
+    try:
+        dias_semana = normalizar_dias(data.get('dias_semana'))
+        horarios_base = normalizar_horarios(data.get('horarios_base'))
+    except ValueError:
+        return jsonify({'erro': 'Dias ou horários inválidos'}), 400
+
     config = ConfiguracaoAgenda.query.filter_by(
         usuario_id=session['user_id']
     ).first()
@@ -512,10 +849,12 @@ def salvar_configuracao_base():
         config = ConfiguracaoAgenda(usuario_id=session['user_id'])
         db.session.add(config)
 
-    config.dias_semana = data.get('dias_semana', [])
-    config.horarios_base = data.get('horarios_base', [])
+    config.dias_semana = dias_semana
+    config.horarios_base = horarios_base
 
+    recalcular_ocupacao(session['user_id'])
     db.session.commit()
+    invalidar_agenda(session['user_id'])
     return jsonify({'status':'ok'})
 
 @main.route('/salvar_excecao_agenda', methods=['POST'])
@@ -525,6 +864,11 @@ def salvar_excecao_agenda():
 
     data_obj = datetime.strptime(data['data'], '%Y-%m-%d').date()
 
+    try:
+        bloqueados = normalizar_horarios(data.get('horarios_bloqueados'))
+    except ValueError:
+        return jsonify({'erro': 'Horários inválidos'}), 400
+
     excecao = ExcecaoAgenda.query.filter_by(
         usuario_id=session['user_id'],
         data=data_obj
@@ -538,9 +882,11 @@ def salvar_excecao_agenda():
         db.session.add(excecao)
 
     excecao.dia_ativo = data.get('dia_ativo', True)
-    excecao.horarios_bloqueados = data.get('horarios_bloqueados', [])
+    excecao.horarios_bloqueados = bloqueados
 
+    recalcular_ocupacao(session['user_id'])
     db.session.commit()
+    invalidar_agenda(session['user_id'])
     return jsonify({'status':'ok'})
 
 @main.route('/salvar_identidade', methods=['POST'])
@@ -554,5 +900,6 @@ def salvar_identidade():
     usuario.fonte_titulo = data.get('fonte_titulo', 'padrao')
     usuario.tema = data.get('tema', 'principal')
 
+    _atualizar_vitrine(usuario.id)
     db.session.commit()
     return jsonify({'status': 'ok'})
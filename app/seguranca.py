@@ -0,0 +1,68 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import criar_cache
+
+
+# =========================
+# LIMITE DE TENTATIVAS (TOKEN BUCKET)
+# =========================
+class LimiteTentativas:
+    """
+    Balde de fichas por chave (usuário, IP): comporta `capacidade`
+    tentativas seguidas e repõe o balde inteiro em `janela` segundos.
+    O estado fica no cache (memória do processo ou CACHE_URL); com
+    vários workers no cache compartilhado a contagem é aproximada.
+    """
+
+    def __init__(self, nome, capacidade, janela):
+        self.capacidade = capacidade
+        self.reposicao = capacidade / janela
+        self._estado = criar_cache(nome, ttl=janela, max_itens=100_000)
+        self._lock = threading.Lock()
+
+    def permitir(self, chave):
+        agora = time.time()
+
+        with self._lock:
+            fichas, ultimo = self._estado.get(chave) or (self.capacidade, agora)
+            fichas = min(self.capacidade, fichas + (agora - ultimo) * self.reposicao)
+
+            if fichas < 1:
+                self._estado.set(chave, (fichas, agora))
+                return False
+
+            self._estado.set(chave, (fichas - 1, agora))
+            return True
+
+
+# =========================
+# HASH DE SENHA EM POOL LIMITADO
+# =========================
+class HashOcupado(Exception):
+    """Todas as vagas de hash estão em uso além do tempo de espera."""
+
+
+class ExecutorHash:
+    """
+    Executa hash/verificação de senha em no máximo `workers` threads.
+    Requisições excedentes esperam até `espera` segundos por uma vaga e
+    então desistem, em vez de tomar a CPU dos agendamentos.
+    """
+
+    def __init__(self, workers, espera):
+        self.espera = espera
+        self._vagas = threading.BoundedSemaphore(workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='hash'
+        )
+
+    def executar(self, funcao, *args):
+        if not self._vagas.acquire(timeout=self.espera):
+            raise HashOcupado()
+
+        try:
+            return self._executor.submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
@@ -0,0 +1,98 @@
+import re
+
+from sqlalchemy import bindparam, select, update
+
+from config import Config
+
+# E.164: até 15 dígitos, incluindo o código do país
+MAX_DIGITOS = 15
+MIN_DIGITOS = 8
+
+# linhas por UPDATE no preenchimento de telefone_normalizado
+LOTE_TELEFONES = 500
+
+_NAO_DIGITO = re.compile(r'\D')
+
+
+# =========================
+# NORMALIZAÇÃO
+# =========================
+def normalizar_telefone(telefone, ddi=None):
+    """
+    Chave canônica no estilo E.164 ('+5511999990000') para qualquer
+    forma digitada: '(11) 99999-0000', '011 99999 0000', '+55 11 ...',
+    '0055 11 ...'. Números sem código do país recebem Config.TELEFONE_DDI.
+    Lança ValueError se não parecer um telefone.
+    """
+    bruto = str(telefone or '').strip()
+    digitos = _NAO_DIGITO.sub('', bruto)
+    ddi = ddi or Config.TELEFONE_DDI
+
+    if bruto.startswith('+'):
+        pass
+    elif digitos.startswith('00'):
+        # prefixo internacional discado
+        digitos = digitos[2:]
+    elif digitos.startswith(ddi) and len(digitos) >= 12:
+        # código do país digitado sem o '+'
+        pass
+    else:
+        # prefixo de longa distância nacional ('011 ...')
+        digitos = ddi + digitos.lstrip('0')
+
+    if not MIN_DIGITOS <= len(digitos) <= MAX_DIGITOS:
+        raise ValueError('telefone inválido')
+
+    return '+' + digitos
+
+
+def telefone_ou_none(telefone):
+    try:
+        return normalizar_telefone(telefone)
+    except ValueError:
+        return None
+
+
+# =========================
+# PREENCHIMENTO DOS REGISTROS ANTIGOS
+# =========================
+def preencher_telefones(conn, lote=LOTE_TELEFONES):
+    """
+    Preenche agendamento.telefone_normalizado onde ainda está nulo,
+    em lotes pela chave primária. Telefones que não normalizam ficam
+    nulos (e fora das consultas do cliente). Retorna quantos gravou.
+    """
+    from .models import Agendamento
+
+    tabela = Agendamento.__table__
+    ultimo_id = 0
+    gravados = 0
+
+    while True:
+        linhas = conn.execute(
+            select(tabela.c.id, tabela.c.telefone).where(
+                tabela.c.telefone_normalizado.is_(None),
+                tabela.c.id > ultimo_id
+            ).order_by(tabela.c.id).limit(lote)
+        ).all()
+
+        if not linhas:
+            return gravados
+
+        valores = []
+        for id_, telefone in linhas:
+            normalizado = telefone_ou_none(telefone)
+            if normalizado:
+                valores.append({'_id': id_, '_telefone': normalizado})
+
+        if valores:
+            # executemany: um único UPDATE preparado para o lote
+            conn.execute(
+                update(tabela).where(
+                    tabela.c.id == bindparam('_id')
+                ).values(telefone_normalizado=bindparam('_telefone')),
+                valores
+            )
+            gravados += len(valores)
+
+        ultimo_id = linhas[-1].id
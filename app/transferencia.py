@@ -0,0 +1,435 @@
+"""
+Importação em lote e exportação em fluxo dos dados de um profissional.
+
+Importação (CSV com cabeçalho, NDJSON ou lista JSON):
+
+    agendamentos: data, horario, nome, telefone, servico, duracao_minutos
+    servicos:     titulo, duracao_minutos (ou tempo), preco (ou valor)
+
+As linhas são lidas em fluxo e gravadas em lotes de LOTE_IMPORTACAO, com
+um commit por lote. Conflitos (agendamento futuro sobrepondo outro pela
+duração, mesmo usuario/data/horário, título de serviço repetido) e linhas
+inválidas não interrompem a importação: voltam no relatório com o número
+da linha.
+
+A exportação usa yield_per, então o resultado nunca fica todo em memória,
+e inclui os agendamentos já arquivados (arquivo.py).
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .arquivo import com_arquivo
+from .disponibilidade import (
+    PASSO_PADRAO, atualizar_ocupacao, carregar_agenda, intervalo,
+    mascaras_gravacao, travar_agenda
+)
+from .models import db, Agendamento, Servico
+from .telefones import normalizar_telefone
+
+# linhas por INSERT (e por commit) na importação
+LOTE_IMPORTACAO = 500
+
+# limite de linhas por arquivo importado
+MAX_LINHAS_IMPORTACAO = 100000
+
+# erros detalhados no relatório (os demais só entram na contagem)
+MAX_ERROS_RELATORIO = 100
+
+# linhas buscadas por vez na exportação
+LOTE_EXPORTACAO = 1000
+
+CAMPOS_AGENDAMENTO = ['data', 'horario', 'nome', 'telefone', 'servico', 'duracao_minutos']
+
+
+# =========================
+# LEITURA
+# =========================
+def ler_linhas(arquivo):
+    """
+    Gera (número da linha, dict) a partir de um arquivo binário em CSV,
+    NDJSON ou lista JSON, sem carregar CSV/NDJSON inteiros na memória.
+    Lança ValueError para formato inválido.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+
+    primeiro = texto.read(1)
+    while primeiro.isspace():
+        primeiro = texto.read(1)
+
+    if primeiro == '[':
+        try:
+            itens = json.loads(primeiro + texto.read())
+        except json.JSONDecodeError:
+            raise ValueError('JSON inválido')
+        for numero, item in enumerate(itens, 1):
+            yield numero, item
+
+    elif primeiro == '{':
+        for numero, linha in enumerate(_encadear(primeiro + texto.readline(), texto), 1):
+            if linha.strip():
+                yield numero, _json_linha(linha)
+
+    elif primeiro:
+        cabecalho = primeiro + texto.readline()
+        leitor = csv.DictReader(
+            _encadear(cabecalho, texto),
+            delimiter=';' if cabecalho.count(';') > cabecalho.count(',') else ','
+        )
+        # linha 1 é o cabeçalho
+        for numero, linha in enumerate(leitor, 2):
+            yield numero, linha
+
+
+def _json_linha(linha):
+    try:
+        return json.loads(linha)
+    except json.JSONDecodeError:
+        raise ValueError('NDJSON inválido')
+
+
+def _encadear(primeira, resto):
+    yield primeira
+    yield from resto
+
+
+def _texto(linha, *campos):
+    for campo in campos:
+        valor = linha.get(campo)
+        if valor not in (None, ''):
+            return str(valor).strip()
+    return None
+
+
+def _data(valor):
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise ValueError(f'data inválida: {valor}')
+
+
+def _horario(valor):
+    for formato in ('%H:%M', '%H:%M:%S'):
+        try:
+            return datetime.strptime(valor, formato).time()
+        except ValueError:
+            pass
+    raise ValueError(f'horário inválido: {valor}')
+
+
+# =========================
+# RELATÓRIO
+# =========================
+class Relatorio:
+
+    def __init__(self):
+        self.inseridos = 0
+        self.conflitos = 0
+        self.invalidos = 0
+        self.erros = []
+
+    def erro(self, numero, tipo, mensagem):
+        if tipo == 'conflito':
+            self.conflitos += 1
+        else:
+            self.invalidos += 1
+
+        if len(self.erros) < MAX_ERROS_RELATORIO:
+            self.erros.append({'linha': numero, 'tipo': tipo, 'erro': mensagem})
+
+    def como_dict(self):
+        return {
+            'inseridos': self.inseridos,
+            'conflitos': self.conflitos,
+            'invalidos': self.invalidos,
+            'erros': self.erros,
+        }
+
+
+def _importar(linhas, converter, gravar_lote):
+    """Converte linha a linha e grava em lotes, com commit por lote."""
+    relatorio = Relatorio()
+    lote = []
+
+    for numero, linha in linhas:
+        if numero > MAX_LINHAS_IMPORTACAO + 1:
+            relatorio.erro(numero, 'invalido', 'limite de linhas excedido')
+            break
+
+        try:
+            lote.append((numero, converter(linha)))
+        except (ValueError, TypeError, AttributeError) as erro:
+            relatorio.erro(numero, 'invalido', str(erro))
+            continue
+
+        if len(lote) >= LOTE_IMPORTACAO:
+            gravar_lote(lote, relatorio)
+            db.session.commit()
+            lote = []
+
+    if lote:
+        gravar_lote(lote, relatorio)
+        db.session.commit()
+
+    return relatorio.como_dict()
+
+
+# =========================
+# IMPORTAÇÃO DE SERVIÇOS
+# =========================
+def importar_servicos(usuario_id, linhas):
+    """
+    Insere os serviços do arquivo. Títulos já cadastrados (sem
+    diferenciar maiúsculas) ou repetidos no arquivo são conflitos.
+    """
+    titulos = {
+        titulo.lower()
+        for titulo in db.session.execute(
+            select(Servico.titulo).where(Servico.usuario_id == usuario_id)
+        ).scalars()
+    }
+
+    def converter(linha):
+        titulo = _texto(linha, 'titulo')
+        if not titulo:
+            raise ValueError('título obrigatório')
+
+        # mesmas conversões do cadastro pela tela (setters de Servico)
+        servico = Servico(
+            titulo=titulo[:120],
+            tempo=_texto(linha, 'duracao_minutos', 'tempo'),
+            valor=_texto(linha, 'preco', 'valor')
+        )
+        if not servico.duracao_minutos or servico.duracao_minutos <= 0:
+            raise ValueError('duração inválida')
+
+        return {
+            'usuario_id': usuario_id,
+            'titulo': servico.titulo,
+            'duracao_minutos': servico.duracao_minutos,
+            'preco': servico.preco,
+            'ativo': True,
+        }
+
+    def gravar_lote(lote, relatorio):
+        novos = []
+        for numero, valores in lote:
+            chave = valores['titulo'].lower()
+            if chave in titulos:
+                relatorio.erro(numero, 'conflito', f"serviço já existe: {valores['titulo']}")
+                continue
+            titulos.add(chave)
+            novos.append(valores)
+
+        if novos:
+            db.session.execute(insert(Servico), novos)
+            relatorio.inseridos += len(novos)
+
+    return _importar(linhas, converter, gravar_lote)
+
+
+# =========================
+# IMPORTAÇÃO DE AGENDAMENTOS
+# =========================
+def importar_agendamentos(usuario_id, linhas):
+    """
+    Insere os agendamentos do arquivo com INSERT ... ON CONFLICT DO
+    NOTHING RETURNING: o que não volta no RETURNING bateu no índice
+    único (usuario_id, data, horario) e é relatado como conflito.
+    Os de hoje em diante são conferidos antes, com a agenda travada,
+    contra os minutos já ocupados (agendamentos, reservas e linhas
+    anteriores do arquivo), como em salvar_agendamento; o histórico
+    entra sem essa conferência. A duração vem do serviço (procurado
+    pelo título entre os do profissional) ou de duracao_minutos.
+    """
+    servicos = {
+        titulo.lower(): (id_, duracao)
+        for id_, titulo, duracao in db.session.execute(
+            select(Servico.id, Servico.titulo, Servico.duracao_minutos).where(
+                Servico.usuario_id == usuario_id
+            )
+        )
+    }
+
+    dialeto = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    tabela = Agendamento.__table__
+
+    # mesma instrução em todos os lotes (compilada uma vez); executada
+    # como executemany, que o SQLAlchemy agrupa em INSERTs de várias linhas
+    stmt = dialeto.insert(tabela).on_conflict_do_nothing(
+        index_elements=['usuario_id', 'data', 'horario']
+    ).returning(tabela.c.data, tabela.c.horario)
+    agora = datetime.utcnow()
+
+    def converter(linha):
+        nome = _texto(linha, 'nome')
+        telefone = _texto(linha, 'telefone')
+        data = _texto(linha, 'data')
+        horario = _texto(linha, 'horario', 'hora')
+        if not (nome and telefone and data and horario):
+            raise ValueError('nome, telefone, data e horario são obrigatórios')
+
+        servico_id = duracao = None
+        titulo = _texto(linha, 'servico')
+        if titulo:
+            if titulo.lower() not in servicos:
+                raise ValueError(f'serviço não encontrado: {titulo}')
+            servico_id, duracao = servicos[titulo.lower()]
+
+        duracao_informada = _texto(linha, 'duracao_minutos')
+        if duracao_informada:
+            duracao = int(duracao_informada)
+        if not duracao or duracao <= 0:
+            raise ValueError('duração inválida: informe o serviço ou duracao_minutos')
+
+        return {
+            'usuario_id': usuario_id,
+            'servico_id': servico_id,
+            'duracao_minutos': duracao,
+            'nome': nome[:100],
+            'telefone': telefone[:20],
+            'telefone_normalizado': normalizar_telefone(telefone),
+            'data': _data(data),
+            'horario': _horario(horario),
+            'criado_em': agora,
+        }
+
+    def _conflito(relatorio, numero, valores):
+        relatorio.erro(
+            numero, 'conflito',
+            f"horário já ocupado: {valores['data'].isoformat()} "
+            f"{valores['horario'].strftime('%H:%M')}"
+        )
+
+    def gravar_lote(lote, relatorio):
+        # serializa com salvar_agendamento até o commit do lote
+        travar_agenda(usuario_id)
+
+        hoje = datetime.now().date()
+        mascaras = mascaras_gravacao(
+            usuario_id,
+            [valores['data'] for _, valores in lote if valores['data'] >= hoje],
+            carregar_agenda(usuario_id).get('passo', PASSO_PADRAO)
+        )
+
+        aceitos = []
+        for numero, valores in lote:
+            if valores['data'] >= hoje:
+                horario = valores['horario']
+                ocupado = intervalo(
+                    horario.hour * 60 + horario.minute, valores['duracao_minutos']
+                )
+                agendado = mascaras.get(valores['data'], 0)
+                if agendado & ocupado:
+                    _conflito(relatorio, numero, valores)
+                    continue
+                mascaras[valores['data']] = agendado | ocupado
+            aceitos.append((numero, valores))
+
+        if not aceitos:
+            return
+
+        inseridos = set(db.session.connection().execute(
+            stmt, [valores for _, valores in aceitos]
+        ).tuples())
+
+        # resumo por dia no mesmo commit do lote
+        atualizar_ocupacao(usuario_id, [data for data, _ in inseridos])
+
+        # repetidos dentro do arquivo: só o primeiro entra
+        for numero, valores in aceitos:
+            chave = (valores['data'], valores['horario'])
+            if chave in inseridos:
+                inseridos.discard(chave)
+                relatorio.inseridos += 1
+            else:
+                _conflito(relatorio, numero, valores)
+
+    return _importar(linhas, converter, gravar_lote)
+
+
+# =========================
+# EXPORTAÇÃO
+# =========================
+def consulta_exportacao(usuario_id, inicio=None, fim=None):
+    """Inclui os agendamentos arquivados quando o período passa por eles."""
+    def consulta(tabela):
+        filtros = [tabela.c.usuario_id == usuario_id]
+        if inicio:
+            filtros.append(tabela.c.data >= inicio)
+        if fim:
+            filtros.append(tabela.c.data <= fim)
+
+        return select(
+            tabela.c.data,
+            tabela.c.horario,
+            tabela.c.nome,
+            tabela.c.telefone,
+            tabela.c.servico_id,
+            tabela.c.duracao_minutos
+        ).where(*filtros)
+
+    linhas = com_arquivo(consulta, inicio).subquery()
+
+    return select(
+        linhas.c.data,
+        linhas.c.horario,
+        linhas.c.nome,
+        linhas.c.telefone,
+        Servico.titulo,
+        func.coalesce(linhas.c.duracao_minutos, Servico.duracao_minutos)
+    ).outerjoin(
+        Servico, Servico.id == linhas.c.servico_id
+    ).order_by(
+        linhas.c.data, linhas.c.horario
+    ).execution_options(yield_per=LOTE_EXPORTACAO)
+
+
+def _registros(usuario_id, inicio, fim):
+    for data, horario, nome, telefone, servico, duracao in db.session.execute(
+        consulta_exportacao(usuario_id, inicio, fim)
+    ):
+        yield {
+            'data': data.isoformat(),
+            'horario': horario.strftime('%H:%M'),
+            'nome': nome,
+            'telefone': telefone,
+            'servico': servico,
+            'duracao_minutos': duracao,
+        }
+
+
+def exportar_csv(usuario_id, inicio=None, fim=None):
+    """Gera o CSV em pedaços de até LOTE_EXPORTACAO linhas."""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=CAMPOS_AGENDAMENTO)
+    escritor.writeheader()
+
+    for i, registro in enumerate(_registros(usuario_id, inicio, fim), 1):
+        escritor.writerow(registro)
+        if i % LOTE_EXPORTACAO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def exportar_ndjson(usuario_id, inicio=None, fim=None):
+    """Um objeto JSON por linha, em pedaços de até LOTE_EXPORTACAO linhas."""
+    pedaco = []
+
+    for registro in _registros(usuario_id, inicio, fim):
+        pedaco.append(json.dumps(registro, ensure_ascii=False))
+        if len(pedaco) >= LOTE_EXPORTACAO:
+            yield '\n'.join(pedaco) + '\n'
+            pedaco = []
+
+    if pedaco:
+        yield '\n'.join(pedaco) + '\n'
@@ -0,0 +1,346 @@
+"""
+Benchmark do funil de agendamento.
+
+Popula um banco local (SQLite temporário por padrão, ou DATABASE_URL via
+--db) e dispara o test client do Flask contra as rotas quentes, com
+concorrência configurável. Mostra p50/p95/p99, queries por requisição e
+vazão, e compara com o baseline salvo.
+
+    python bench/funil.py                         # roda e compara
+    python bench/funil.py --salvar-baseline       # grava novo baseline
+    python bench/funil.py --db postgresql://...   # Postgres local, banco vazio
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as hora, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PADRAO = os.path.join(RAIZ, 'bench', 'baseline.json')
+
+# horários base: 08:00 às 18:30, a cada 30 minutos (em minutos)
+HORARIOS_BASE = list(range(8 * 60, 19 * 60, 30))
+
+
+def argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--db', help='URL do banco (padrão: SQLite temporário)')
+    parser.add_argument('--provedores', type=int, default=5)
+    parser.add_argument('--agendamentos', type=int, default=3000)
+    parser.add_argument('--requisicoes', type=int, default=200, help='por cenário')
+    parser.add_argument('--concorrencia', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', default=BASELINE_PADRAO)
+    parser.add_argument('--salvar-baseline', action='store_true')
+    parser.add_argument(
+        '--tolerancia', type=float, default=0.25,
+        help='piora aceita no p95 antes de acusar regressão (0.25 = 25%%)'
+    )
+    return parser.parse_args()
+
+
+# =========================
+# DADOS
+# =========================
+def popular(db, modelos, args):
+    Usuario, Servico, ConfiguracaoAgenda, ExcecaoAgenda, Agendamento = modelos
+    aleatorio = random.Random(args.seed)
+    hoje = date.today()
+
+    db.create_all()
+    if Usuario.query.first():
+        sys.exit('O banco precisa estar vazio (use um banco descartável em --db).')
+
+    provedores = []
+    for i in range(args.provedores):
+        usuario = Usuario(username=f'bench{i}', slug=f'bench-{i}')
+        usuario.set_password('bench')
+        db.session.add(usuario)
+        db.session.flush()
+
+        servicos = [
+            Servico(usuario_id=usuario.id, titulo='Corte', duracao_minutos=30, preco=40),
+            Servico(usuario_id=usuario.id, titulo='Barba', duracao_minutos=30, preco=30),
+            Servico(usuario_id=usuario.id, titulo='Completo', duracao_minutos=90, preco=90),
+        ]
+        db.session.add_all(servicos)
+        db.session.add(ConfiguracaoAgenda(
+            usuario_id=usuario.id,
+            dias_semana=[0, 1, 2, 3, 4, 5],
+            horarios_base=HORARIOS_BASE
+        ))
+        for d in range(0, 60, 9):
+            db.session.add(ExcecaoAgenda(
+                usuario_id=usuario.id,
+                data=hoje + timedelta(days=d),
+                dia_ativo=d % 2 == 0,
+                horarios_bloqueados=[12 * 60]
+            ))
+        db.session.flush()
+        provedores.append((usuario.id, usuario.slug, [s.id for s in servicos]))
+
+    # agendamentos: ~80% histórico, ~20% nas próximas semanas
+    ocupados = set()
+    linhas = []
+    while len(linhas) < args.agendamentos:
+        usuario_id, _, servicos = aleatorio.choice(provedores)
+        dia = hoje + timedelta(days=aleatorio.randint(-365, 60))
+        minuto = aleatorio.choice(HORARIOS_BASE)
+        if (usuario_id, dia, minuto) in ocupados:
+            continue
+        ocupados.add((usuario_id, dia, minuto))
+        telefone = f'1199{aleatorio.randint(0, 9999999):07d}'
+        linhas.append({
+            'usuario_id': usuario_id,
+            'servico_id': servicos[0],
+            'duracao_minutos': 30,
+            'nome': 'Cliente',
+            'telefone': telefone,
+            'telefone_normalizado': '+55' + telefone,
+            'data': dia,
+            'horario': hora(minuto // 60, minuto % 60),
+        })
+
+    db.session.execute(Agendamento.__table__.insert(), linhas)
+    db.session.commit()
+    return provedores
+
+
+# =========================
+# CENÁRIOS
+# =========================
+def dia_util_futuro(aleatorio):
+    dia = date.today() + timedelta(days=aleatorio.randint(1, 45))
+    while dia.weekday() == 6:
+        dia += timedelta(days=1)
+    return dia
+
+
+def cenarios(provedores):
+    def vitrine(cliente, aleatorio, provedor):
+        return cliente.get(f'/agenda/{provedor[1]}')
+
+    def verificar(cliente, aleatorio, provedor):
+        return cliente.post('/verificar_horarios', json={
+            'data': dia_util_futuro(aleatorio).isoformat(),
+            'servico_id': aleatorio.choice(provedor[2]),
+        })
+
+    def disponibilidade_mes(cliente, aleatorio, provedor):
+        inicio = date.today()
+        return cliente.get(
+            f'/disponibilidade/{provedor[2][0]}'
+            f'?de={inicio.isoformat()}&ate={(inicio + timedelta(days=30)).isoformat()}'
+        )
+
+    def confirmar(cliente, aleatorio, provedor):
+        minuto = aleatorio.choice(HORARIOS_BASE)
+        return cliente.post('/confirmar_agendamento', data={
+            'servico_id': provedor[2][0],
+            'data': dia_util_futuro(aleatorio).isoformat(),
+            'hora': f'{minuto // 60:02d}:{minuto % 60:02d}',
+        })
+
+    def salvar(cliente, aleatorio, provedor):
+        minuto = aleatorio.choice(HORARIOS_BASE)
+        return cliente.post('/salvar_agendamento', data={
+            'servico_id': provedor[2][0],
+            'data': dia_util_futuro(aleatorio).isoformat(),
+            'hora': f'{minuto // 60:02d}:{minuto % 60:02d}',
+            'nome': 'Bench',
+            'telefone': '11999990000',
+        })
+
+    def admin(cliente, aleatorio, provedor):
+        return cliente.get('/admin')
+
+    def relatorio(cliente, aleatorio, provedor):
+        return cliente.get('/relatorio')
+
+    # (nome, função, precisa de login)
+    return [
+        ('agenda_slug', vitrine, False),
+        ('verificar_horarios', verificar, False),
+        ('disponibilidade_mes', disponibilidade_mes, False),
+        ('confirmar_agendamento', confirmar, False),
+        ('salvar_agendamento', salvar, False),
+        ('admin', admin, True),
+        ('relatorio', relatorio, True),
+    ]
+
+
+# =========================
+# EXECUÇÃO
+# =========================
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def executar(app, provedores, args):
+    resultados = {}
+    local = threading.local()
+
+    for nome, funcao, login in cenarios(provedores):
+        latencias, queries, erros = [], [], 0
+
+        def uma(i):
+            # cada thread usa seu próprio cliente (e sua sessão)
+            chave = f'cliente_{nome}'
+            if not hasattr(local, chave):
+                aleatorio = random.Random(args.seed + i)
+                provedor = aleatorio.choice(provedores)
+                cliente = app.test_client()
+                if login:
+                    cliente.post('/login', data={
+                        'username': f'bench{provedores.index(provedor)}',
+                        'password': 'bench',
+                    })
+                setattr(local, chave, (cliente, aleatorio, provedor))
+
+            cliente, aleatorio, provedor = getattr(local, chave)
+
+            inicio = time.perf_counter()
+            resposta = funcao(cliente, aleatorio, provedor)
+            duracao = time.perf_counter() - inicio
+
+            encontrado = QUERIES.search(resposta.headers.get('Server-Timing', ''))
+            return duracao, int(encontrado.group(1)) if encontrado else 0, resposta.status_code
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+            for duracao, n_queries, status in executor.map(uma, range(args.requisicoes)):
+                latencias.append(duracao)
+                queries.append(n_queries)
+                # 409 é resposta esperada quando o horário sorteado está ocupado
+                if status >= 500:
+                    erros += 1
+        total = time.perf_counter() - inicio
+
+        resultados[nome] = {
+            'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+            'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+            'queries_por_req': round(sum(queries) / len(queries), 2),
+            'req_por_s': round(len(latencias) / total, 1),
+            'erros': erros,
+        }
+
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia):
+    regressoes = []
+    for nome, atual in resultados.items():
+        anterior = baseline.get(nome)
+        if not anterior:
+            continue
+        if atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regressoes.append(f"{nome}: p95 {anterior['p95_ms']} -> {atual['p95_ms']} ms")
+        # margem para o ruído de caches frios; um N+1 soma >= 1 por requisição
+        if atual['queries_por_req'] > anterior['queries_por_req'] + 0.5:
+            regressoes.append(
+                f"{nome}: queries/req {anterior['queries_por_req']} -> {atual['queries_por_req']}"
+            )
+        if atual['erros']:
+            regressoes.append(f"{nome}: {atual['erros']} respostas 5xx")
+    return regressoes
+
+
+def main():
+    args = argumentos()
+
+    # precisa estar no ambiente antes de importar o app (Config lê na importação)
+    os.environ['DATABASE_URL'] = args.db or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(prefix='bench-'), 'bench.db'
+    )
+    os.environ['METRICS_ENABLED'] = '1'
+    # todas as threads fazem login do mesmo IP
+    os.environ['LOGIN_LIMITE_TENTATIVAS'] = '100000'
+    sys.path.insert(0, RAIZ)
+
+    from app import create_app
+    from app.disponibilidade import reconstruir_ocupacao
+    from app.migracoes import atualizar_schema
+    from app.models import (
+        db, Usuario, Servico, ConfiguracaoAgenda, ExcecaoAgenda, Agendamento
+    )
+
+    app = create_app()
+    app.logger.setLevel('WARNING')
+
+    with app.app_context():
+        provedores = popular(
+            db,
+            (Usuario, Servico, ConfiguracaoAgenda, ExcecaoAgenda, Agendamento),
+            args
+        )
+        atualizar_schema(db)
+
+        # os agendamentos entram por INSERT direto, sem passar por
+        # atualizar_ocupacao(); a migração 0003 só monta o resumo uma vez
+        # por banco, então ele é refeito aqui a partir das linhas inseridas
+        with db.engine.begin() as conn:
+            reconstruir_ocupacao(conn)
+
+    resultados = executar(app, provedores, args)
+
+    print(f"{'cenário':<24}{'p50':>9}{'p95':>9}{'p99':>9}{'q/req':>8}{'req/s':>9}")
+    for nome, r in resultados.items():
+        print(
+            f"{nome:<24}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+            f"{r['queries_por_req']:>8}{r['req_por_s']:>9}"
+        )
+
+    parametros = {
+        'provedores': args.provedores,
+        'agendamentos': args.agendamentos,
+        'requisicoes': args.requisicoes,
+        'concorrencia': args.concorrencia,
+    }
+
+    if args.salvar_baseline:
+        with open(args.baseline, 'w') as arquivo:
+            json.dump(
+                {'parametros': parametros, 'resultados': resultados},
+                arquivo, indent=2, sort_keys=True
+            )
+            arquivo.write('\n')
+        print(f'\nBaseline salvo em {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('\nSem baseline para comparar (use --salvar-baseline).')
+        return 0
+
+    with open(args.baseline) as arquivo:
+        baseline = json.load(arquivo)
+
+    if baseline.get('parametros') != parametros:
+        print('\nBaseline gerado com outros parâmetros; comparação ignorada.')
+        return 0
+
+    regressoes = comparar(resultados, baseline['resultados'], args.tolerancia)
+    if regressoes:
+        print('\nREGRESSÕES:')
+        for linha in regressoes:
+            print(f'  - {linha}')
+        return 1
+
+    print('\nSem regressões em relação ao baseline.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,10 +5,134 @@ INSTANCE_DIR = os.path.join(BASE_DIR, 'agendamento', 'instance')
 
 os.makedirs(INSTANCE_DIR, exist_ok=True)
 
+
+def _env_int(nome, padrao):
+    return int(os.getenv(nome, padrao))
+
+
+def _env_bool(nome, padrao):
+    return os.getenv(nome, str(padrao)).lower() in ('1', 'true', 'sim', 'yes')
+
+
+def opcoes_engine(uri):
+    """
+    Perfil do engine do SQLAlchemy conforme o banco, ajustável por
+    variáveis de ambiente (DB_*). Os PRAGMAs do SQLite ficam em
+    app/banco.py, aplicados a cada nova conexão.
+    """
+    opcoes = {
+        # cache de SQL compilado do SQLAlchemy (por engine)
+        'query_cache_size': _env_int('DB_QUERY_CACHE_SIZE', 500),
+    }
+
+    if uri.startswith('sqlite'):
+        opcoes['connect_args'] = {
+            # espera pelo lock de escrita em vez de falhar na hora
+            'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 15),
+            # statements preparados mantidos por conexão
+            'cached_statements': _env_int('SQLITE_CACHED_STATEMENTS', 256),
+        }
+        return opcoes
+
+    opcoes.update({
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    })
+
+    if uri.startswith('postgresql'):
+        opcoes['connect_args'] = {
+            'options': f"-c statement_timeout={_env_int('DB_STATEMENT_TIMEOUT_MS', 5000)}",
+        }
+
+    return opcoes
+
+
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv(
         'DATABASE_URL',
         f"sqlite:///{os.path.join(INSTANCE_DIR, 'local.db')}"
     )
+    SQLALCHEMY_ENGINE_OPTIONS = opcoes_engine(SQLALCHEMY_DATABASE_URI)
+    DB_STATEMENT_TIMEOUT_MS = _env_int('DB_STATEMENT_TIMEOUT_MS', 5000)
+
+    # engine do app ASGI (app/assincrono.py); padrão: DATABASE_URL com o
+    # driver assíncrono equivalente (aiosqlite / asyncpg)
+    ASYNC_DATABASE_URL = os.getenv('ASYNC_DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'chave-secreta')
+
+    # custo do hash de senha (formato do werkzeug); senhas com outro
+    # método são refeitas no próximo login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+    # proxies reversos à frente do app (o deploy usa um): o IP do cliente
+    # nos limites de tentativas vem do X-Forwarded-For que eles
+    # acrescentam. Use 0 se o app ficar exposto direto (sem proxy)
+    PROXIES_CONFIAVEIS = _env_int('PROXIES_CONFIAVEIS', 1)
+
+    # login/cadastro: tentativas por usuário e por IP a cada janela (s)
+    LOGIN_LIMITE_TENTATIVAS = _env_int('LOGIN_LIMITE_TENTATIVAS', 5)
+    LOGIN_LIMITE_JANELA = _env_int('LOGIN_LIMITE_JANELA', 60)
+
+    # reserva do horário enquanto o cliente preenche os dados (s)
+    RESERVA_TTL = _env_int('RESERVA_TTL', 300)
+
+    # hashes de senha simultâneos por processo e espera máxima por vaga (s)
+    HASH_WORKERS = _env_int('HASH_WORKERS', 2)
+    HASH_ESPERA = _env_int('HASH_ESPERA', 2)
+
+    # código do país assumido para telefones digitados sem ele
+    TELEFONE_DDI = os.getenv('TELEFONE_DDI', '55')
+
+    # bytecode dos templates compilados, reaproveitado entre processos e
+    # reinícios (vazio desativa)
+    JINJA_CACHE_DIR = os.getenv('JINJA_CACHE_DIR', os.path.join(INSTANCE_DIR, 'jinja'))
+
+    # gzip/brotli nas respostas HTML e JSON a partir de N bytes; níveis
+    # baixos porque a compressão acontece a cada requisição
+    COMPRESSAO_ATIVA = _env_bool('COMPRESSAO_ATIVA', True)
+    COMPRESSAO_MIN_BYTES = _env_int('COMPRESSAO_MIN_BYTES', 1024)
+    COMPRESSAO_NIVEL_GZIP = _env_int('COMPRESSAO_NIVEL_GZIP', 6)
+    COMPRESSAO_NIVEL_BROTLI = _env_int('COMPRESSAO_NIVEL_BROTLI', 4)
+
+    # tempo máximo esperado para create_app(); acima disso gera aviso
+    STARTUP_BUDGET_MS = _env_int('STARTUP_BUDGET_MS', 500)
+
+    # latência/queries por endpoint em /metrics e no header Server-Timing
+    METRICS_ENABLED = _env_bool('METRICS_ENABLED', False)
+
+    # testes: falha em qualquer lazy load (N+1) durante as requisições
+    LAZYLOAD_ESTRITO = _env_bool('LAZYLOAD_ESTRITO', False)
+
+    # PRAGMAs do SQLite (ignorados em outros bancos)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+
+    # outbox: eventos por lote, tentativas e espera base do backoff (s),
+    # e reserva de um lote por um worker antes de outro poder pegá-lo (s)
+    OUTBOX_LOTE = _env_int('OUTBOX_LOTE', 50)
+    OUTBOX_MAX_TENTATIVAS = _env_int('OUTBOX_MAX_TENTATIVAS', 8)
+    OUTBOX_BACKOFF = _env_int('OUTBOX_BACKOFF', 5)
+    OUTBOX_RESERVA = _env_int('OUTBOX_RESERVA', 120)
+    OUTBOX_RETENCAO_DIAS = _env_int('OUTBOX_RETENCAO_DIAS', 7)
+
+    # eventos de agendamento enviados por POST JSON (ex: alerta ao
+    # profissional, mensagem ao cliente); sem URL só ficam registrados
+    OUTBOX_WEBHOOK_URL = os.getenv('OUTBOX_WEBHOOK_URL')
+    OUTBOX_WEBHOOK_TIMEOUT = _env_int('OUTBOX_WEBHOOK_TIMEOUT', 5)
+
+    # agendamentos de meses anteriores aos últimos ARQUIVO_MESES vão
+    # para agendamento_arquivo (flask agendamentos-arquivar); no
+    # Postgres, as partições mensais podem ficar num tablespace próprio
+    ARQUIVO_MESES = _env_int('ARQUIVO_MESES', 6)
+    ARQUIVO_TABLESPACE = os.getenv('ARQUIVO_TABLESPACE')
+
+    # cache compartilhado entre workers (ex: redis://localhost:6379/0);
+    # sem ele, cada processo usa um cache em memória
+    CACHE_URL = os.getenv('CACHE_URL')
+    CACHE_AGENDA_TTL = int(os.getenv('CACHE_AGENDA_TTL', 300))
+    CACHE_VITRINE_TTL = int(os.getenv('CACHE_VITRINE_TTL', 3600))
+    CACHE_RELATORIO_TTL = int(os.getenv('CACHE_RELATORIO_TTL', 600))
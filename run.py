@@ -1,9 +1,12 @@
 from app import create_app, db
+from app.migracoes import atualizar_schema
 
 app = create_app()
 
-with app.app_context():
-    db.create_all()
-
 if __name__ == '__main__':
+    # DEV: cria/atualiza o banco local antes de subir o servidor
+    with app.app_context():
+        db.create_all()
+        atualizar_schema(db)
+
     app.run(host='0.0.0.0', port=5000, debug=True)
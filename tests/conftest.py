@@ -0,0 +1,112 @@
+import os
+import tempfile
+from datetime import date, time
+
+import pytest
+
+# antes de importar o app: Config lê o ambiente na importação
+_pasta = tempfile.mkdtemp()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_pasta, 'testes.db')}"
+os.environ['LAZYLOAD_ESTRITO'] = '1'
+os.environ['JINJA_CACHE_DIR'] = ''
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+os.environ.pop('CACHE_URL', None)
+
+from app import create_app  # noqa: E402
+from app.migracoes import atualizar_schema  # noqa: E402
+from app.models import (  # noqa: E402
+    db, Agendamento, ConfiguracaoAgenda, Servico, Usuario
+)
+
+# terça-feira sem exceções na agenda de teste
+DIA = date(2030, 1, 8)
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+def _limpar_caches():
+    from app import auth, disponibilidade, relatorios, routes
+
+    disponibilidade.cache_agenda.clear()
+    relatorios._cache.clear()
+    routes._cache_vitrine.clear()
+    auth.limite_login._estado.clear()
+
+
+@pytest.fixture(autouse=True)
+def banco(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        atualizar_schema(db)
+    _limpar_caches()
+
+    yield
+
+    with app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def agenda(app):
+    """Profissional 'ana' (senha 'x'): seg-sex, 08:00-11:00, dois serviços."""
+    with app.app_context():
+        usuario = Usuario(username='ana', slug='ana')
+        usuario.set_password('x')
+        db.session.add(usuario)
+        db.session.flush()
+
+        curto = Servico(usuario_id=usuario.id, titulo='Corte', duracao_minutos=60, preco=50)
+        longo = Servico(usuario_id=usuario.id, titulo='Longo', duracao_minutos=90, preco=80)
+        db.session.add_all([curto, longo])
+        db.session.add(ConfiguracaoAgenda(
+            usuario_id=usuario.id,
+            dias_semana=[0, 1, 2, 3, 4],
+            horarios_base=[480, 540, 600, 660]
+        ))
+        db.session.commit()
+
+        return {'usuario': usuario.id, 'curto': curto.id, 'longo': longo.id}
+
+
+@pytest.fixture
+def logado(client, agenda):
+    resposta = client.post('/login', data={'username': 'ana', 'password': 'x'})
+    assert resposta.status_code == 302
+    return client
+
+
+def agendar(client, servico_id, hora, dia=DIA, **extra):
+    return client.post('/salvar_agendamento', data={
+        'nome': 'Cliente',
+        'telefone': '11988887777',
+        'data': dia.isoformat(),
+        'hora': hora,
+        'servico_id': servico_id,
+        **extra
+    })
+
+
+def criar_agendamentos(usuario_id, dias, horarios=(time(8), time(9), time(10))):
+    for dia in dias:
+        for horario in horarios:
+            db.session.add(Agendamento(
+                usuario_id=usuario_id,
+                nome='Cliente',
+                telefone='11988887777',
+                telefone_normalizado='+5511988887777',
+                data=dia,
+                horario=horario,
+                duracao_minutos=60
+            ))
+    db.session.commit()
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+
+import pytest
+
+from werkzeug.datastructures import MultiDict
+
+from app.models import Agendamento
+from app.routes import _pagina_agendamentos
+
+from conftest import criar_agendamentos
+
+INICIO = date(2030, 1, 7)
+
+
+def _todas_as_paginas(app, usuario_id, limite):
+    vistos = []
+    args = {'de': INICIO.isoformat(), 'ate': (INICIO + timedelta(days=9)).isoformat(), 'limite': limite}
+
+    with app.test_request_context():
+        while True:
+            pagina, proximo, _, _ = _pagina_agendamentos(usuario_id, MultiDict(args))
+            assert len(pagina) <= limite
+            vistos += [ag.id for ag in pagina]
+            if not proximo:
+                return vistos
+            args['apos'] = proximo
+
+
+def test_paginacao_por_chave_percorre_tudo_uma_vez(app, agenda):
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [INICIO + timedelta(days=d) for d in range(10)])
+        esperado = [
+            ag.id for ag in Agendamento.query.order_by(
+                Agendamento.data, Agendamento.horario, Agendamento.id
+            )
+        ]
+
+    for limite in (1, 7, 30, 200):
+        assert _todas_as_paginas(app, agenda['usuario'], limite) == esperado
+
+
+def test_admin_lista_periodo(logado, app, agenda):
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [INICIO])
+
+    resposta = logado.get(f'/admin?de={INICIO.isoformat()}&ate={INICIO.isoformat()}&limite=2')
+
+    assert resposta.status_code == 200
+    assert resposta.data.count(b'href="tel:') == 2
+    assert b'apos=' in resposta.data
+
+
+@pytest.mark.parametrize('limite, esperado', [
+    ('-1', 1), ('-5', 1), ('0', 30), ('abc', 30), ('9999', 30),
+])
+def test_limite_fora_da_faixa(logado, app, agenda, limite, esperado):
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [INICIO + timedelta(days=d) for d in range(10)])
+
+    resposta = logado.get(
+        f'/admin/agendamentos?de={INICIO.isoformat()}&ate=2030-01-31&limite={limite}'
+    )
+
+    assert resposta.status_code == 200
+    assert len(resposta.json['agendamentos']) == esperado
+    assert (resposta.json['proximo'] is None) == (esperado == 30)
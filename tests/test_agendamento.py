@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import routes
+from app.models import Agendamento
+
+from conftest import agendar
+
+
+def test_mesmo_horario_retorna_409(client, agenda):
+    assert agendar(client, agenda['curto'], '09:00').status_code == 200
+    assert agendar(client, agenda['curto'], '09:00').status_code == 409
+
+
+def test_violacao_do_indice_unico_retorna_409(app, client, agenda, monkeypatch):
+    assert agendar(client, agenda['curto'], '09:00').status_code == 200
+
+    # conferência contornada: o índice único barra no flush
+    monkeypatch.setattr(
+        routes, 'horarios_livres_gravacao', lambda *args, **kwargs: ['09:00']
+    )
+
+    assert agendar(client, agenda['curto'], '09:00').status_code == 409
+    with app.app_context():
+        assert Agendamento.query.count() == 1
+
+
+def test_agendamentos_simultaneos_gravam_um_so(app, agenda):
+    def tentar(_):
+        return agendar(app.test_client(), agenda['longo'], '09:00').status_code
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        respostas = sorted(executor.map(tentar, range(4)))
+
+    assert respostas == [200, 409, 409, 409]
+    with app.app_context():
+        assert Agendamento.query.count() == 1
@@ -0,0 +1,52 @@
+import json
+from datetime import date, timedelta
+
+from app.arquivo import arquivar_agendamentos, inicio_periodo_ativo
+from app.models import Agendamento, AgendamentoArquivo
+from app.relatorios import _calcular
+
+from conftest import criar_agendamentos
+
+
+def test_inicio_periodo_ativo():
+    assert inicio_periodo_ativo(date(2030, 3, 15), meses=2) == date(2030, 1, 1)
+    assert inicio_periodo_ativo(date(2030, 1, 31), meses=1) == date(2029, 12, 1)
+    assert inicio_periodo_ativo(date(2030, 1, 31), meses=0) == date(2030, 1, 1)
+
+
+def test_arquivamento_preserva_relatorio(app, agenda):
+    ano = date.today().year - 1
+    corte = date(ano, 6, 1)
+
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [
+            date(ano, 3, 1) + timedelta(days=7 * semana) for semana in range(20)
+        ])
+        antes = _calcular(agenda['usuario'], ano)
+
+        movidos = arquivar_agendamentos(antes_de=corte, lote=7)
+
+        assert movidos == AgendamentoArquivo.query.count() > 0
+        assert Agendamento.query.filter(Agendamento.data < corte).count() == 0
+        assert _calcular(agenda['usuario'], ano) == antes
+        assert arquivar_agendamentos(antes_de=corte) == 0
+
+
+def test_arquivamento_nunca_passa_do_mes_atual(app, agenda):
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [date.today() + timedelta(days=1)])
+
+        assert arquivar_agendamentos(antes_de=date.today() + timedelta(days=400)) == 0
+        assert Agendamento.query.count() == 3
+
+
+def test_exportacao_inclui_arquivados(app, logado, agenda):
+    dia = date(date.today().year - 1, 3, 1)
+
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [dia])
+        assert arquivar_agendamentos(antes_de=date(dia.year, 6, 1)) == 3
+
+    linhas = logado.get('/exportar/agendamentos?formato=ndjson').data.decode().splitlines()
+
+    assert [json.loads(linha)['horario'] for linha in linhas] == ['08:00', '09:00', '10:00']
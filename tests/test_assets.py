@@ -0,0 +1,71 @@
+import gzip
+import json
+import os
+
+from flask import Flask, url_for
+
+from app.assets import CACHE_IMUTAVEL, DIST, MANIFESTO, construir, iniciar_assets
+
+
+def _static(tmp_path, css='body { color: #333; }'):
+    pasta = tmp_path / 'static'
+    (pasta / 'css').mkdir(parents=True, exist_ok=True)
+    (pasta / 'css' / 'base.css').write_text(css * 100)
+    (pasta / 'logo.png').write_bytes(b'\x89PNG fake')
+    return str(pasta)
+
+
+def test_manifesto_com_nomes_por_conteudo(tmp_path):
+    pasta = _static(tmp_path)
+
+    manifesto = construir(pasta)
+
+    gerado = manifesto['arquivos']['css/base.css']
+    assert gerado.startswith(f'{DIST}/css/base.') and gerado.endswith('.css')
+    with open(os.path.join(pasta, gerado), 'rb') as arquivo:
+        assert arquivo.read() == (tmp_path / 'static' / 'css' / 'base.css').read_bytes()
+    with open(os.path.join(pasta, gerado + '.gz'), 'rb') as arquivo:
+        assert gzip.decompress(arquivo.read()).startswith(b'body')
+    # imagens não são pré-comprimidas
+    assert not os.path.exists(os.path.join(pasta, manifesto['arquivos']['logo.png'] + '.gz'))
+
+    with open(os.path.join(pasta, DIST, MANIFESTO)) as arquivo:
+        assert json.load(arquivo) == manifesto
+
+    # mesmo conteúdo, mesmo nome
+    assert construir(pasta) == manifesto
+
+
+def test_builds_anteriores_continuam_servidos(tmp_path):
+    nomes = []
+    for versao in range(4):
+        pasta = _static(tmp_path, css=f'body {{ color: #{versao}{versao}{versao}; }}')
+        nomes.append(construir(pasta, mantidos=3)['arquivos']['css/base.css'])
+
+    existe = [os.path.exists(os.path.join(pasta, nome)) for nome in nomes]
+    assert existe == [False, True, True, True]
+    assert not os.path.exists(os.path.join(pasta, nomes[0] + '.gz'))
+    # a imagem não mudou: segue valendo para todos os builds
+    assert os.path.exists(os.path.join(pasta, construir(pasta)['arquivos']['logo.png']))
+
+
+def test_url_com_hash_e_cache_imutavel(tmp_path):
+    pasta = _static(tmp_path)
+    gerado = construir(pasta)['arquivos']['css/base.css']
+
+    app = Flask(__name__, static_folder=pasta)
+    iniciar_assets(app)
+
+    with app.test_request_context():
+        assert url_for('static', filename='css/base.css') == f'/static/{gerado}'
+
+    cliente = app.test_client()
+    resposta = cliente.get(f'/static/{gerado}', headers={'Accept-Encoding': 'gzip'})
+
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert resposta.headers['Cache-Control'] == CACHE_IMUTAVEL
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    assert gzip.decompress(resposta.data).startswith(b'body')
+
+    # sem build o arquivo original continua disponível
+    assert cliente.get('/static/css/base.css').status_code == 200
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip('aiosqlite')
+
+from app.assincrono import AppDisponibilidade, livres_periodo  # noqa: E402
+
+from conftest import DIA, agendar  # noqa: E402
+
+
+def _requisitar(asgi, metodo, caminho, corpo=None, headers=()):
+    """(status, json) de uma requisição direto no app ASGI."""
+    caminho, _, query = caminho.partition('?')
+    scope = {
+        'type': 'http', 'method': metodo, 'path': caminho,
+        'query_string': query.encode(), 'headers': list(headers),
+    }
+    mensagens = [{
+        'type': 'http.request',
+        'body': json.dumps(corpo).encode() if corpo is not None else b'',
+    }]
+    enviadas = []
+
+    async def receive():
+        return mensagens.pop(0)
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    async def executar():
+        try:
+            await asgi(scope, receive, send)
+        finally:
+            await asgi.engine.dispose()
+
+    asyncio.run(executar())
+    return enviadas[0]['status'], json.loads(enviadas[1]['body'])
+
+
+def test_agenda_alterada_no_flask_vale_no_asgi(logado, agenda):
+    asgi = AppDisponibilidade()
+
+    async def consultar():
+        return (await livres_periodo(
+            asgi.engine, agenda['curto'], DIA, DIA, asgi.cache
+        ))[DIA]
+
+    async def cenario():
+        asgi._iniciar()
+        try:
+            antes = await consultar()
+
+            # gravação pelo app Flask (outro processo em produção)
+            resposta = logado.post('/salvar_excecao_agenda', json={
+                'data': DIA.isoformat(),
+                'horarios_bloqueados': ['09:00'],
+            })
+            assert resposta.status_code == 200
+
+            return antes, await consultar()
+        finally:
+            await asgi.engine.dispose()
+
+    antes, depois = asyncio.run(cenario())
+
+    assert antes == ['08:00', '09:00', '10:00', '11:00']
+    assert depois == ['08:00', '10:00', '11:00']
+
+
+@pytest.mark.parametrize('caminho', [
+    '/disponibilidade/{curto}?de={dia}',
+    '/disponibilidade/{curto}/proximo?de={dia}',
+])
+def test_mesma_resposta_do_flask(client, agenda, caminho):
+    agendar(client, agenda['longo'], '08:00')
+    caminho = caminho.format(curto=agenda['curto'], dia=DIA.isoformat())
+
+    flask = client.get(caminho)
+
+    assert _requisitar(AppDisponibilidade(), 'GET', caminho) == (200, flask.json)
+
+
+@pytest.mark.parametrize('caminho', [
+    '/disponibilidade/qualquer/{curto}',
+    '/disponibilidade/{curto}/outro',
+    '/disponibilidade/{curto}/',
+])
+def test_caminho_desconhecido_retorna_404(agenda, caminho):
+    status, _ = _requisitar(
+        AppDisponibilidade(), 'GET', caminho.format(curto=agenda['curto'])
+    )
+    assert status == 404
+
+
+@pytest.mark.parametrize('dados', [
+    {'data': '08/01/2030', 'servico_id': 1},
+    {'data': '2030-01-08', 'servico_id': 'abc'},
+    {'data': '2030-01-08', 'servico_id': 9999},
+    {'data': '2030-01-08'},
+    {'data': '2030-01-08', 'servico_id': 1},
+])
+def test_verificar_horarios_igual_ao_flask(client, agenda, dados):
+    flask = client.post('/verificar_horarios', json=dados)
+
+    assert _requisitar(AppDisponibilidade(), 'POST', '/verificar_horarios', dados) == (
+        flask.status_code, flask.json
+    )
+
+
+def test_reserva_do_cliente_vem_do_cookie_do_flask(app, agenda):
+    dono, outro = app.test_client(), app.test_client()
+    dono.post('/confirmar_agendamento', data={
+        'servico_id': agenda['curto'], 'data': DIA.isoformat(), 'hora': '09:00',
+    })
+    cookie = f"session={dono.get_cookie('session').value}".encode()
+    corpo = {'data': DIA.isoformat(), 'servico_id': agenda['curto']}
+
+    _, livres_dono = _requisitar(
+        AppDisponibilidade(), 'POST', '/verificar_horarios', corpo,
+        headers=[(b'cookie', cookie)]
+    )
+    _, livres_outro = _requisitar(
+        AppDisponibilidade(), 'POST', '/verificar_horarios', corpo
+    )
+    _, livres_forjado = _requisitar(
+        AppDisponibilidade(), 'POST', '/verificar_horarios', corpo,
+        headers=[(b'cookie', cookie[:-2] + b'xx')]
+    )
+
+    assert '09:00' in livres_dono
+    assert '09:00' not in livres_outro
+    assert '09:00' not in livres_forjado
+    assert livres_dono == dono.post('/verificar_horarios', json=corpo).json
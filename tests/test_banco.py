@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app.models import Usuario
+
+
+def test_lazyload_estrito_ativo_nos_testes(app, agenda):
+    assert app.config['LAZYLOAD_ESTRITO']
+
+    with app.app_context():
+        usuario = Usuario.query.first()
+        with pytest.raises(InvalidRequestError):
+            usuario.agendamentos
+
+
+def test_paginas_principais_sem_lazyload(logado, agenda):
+    for url in ('/agenda/ana', '/admin', '/relatorio', '/servicos', '/configuracoes'):
+        assert logado.get(url).status_code == 200, url
+    assert logado.post('/consultar', data={'telefone': '11988887777', 'historico': '1'}).status_code == 200
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import inspect, text
+
+from app.migracoes import atualizar_schema
+from app.models import db
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_atualizar_schema_pode_repetir(app):
+    with app.app_context():
+        atualizar_schema(db)
+        atualizar_schema(db)
+
+
+def test_db_init_cria_e_atualiza_o_banco(app):
+    with app.app_context():
+        db.drop_all()
+        assert 'agendamento' not in inspect(db.engine).get_table_names()
+
+    runner = app.test_cli_runner()
+    # o `flask` (FlaskGroup) abre o contexto do app para os comandos
+    with app.app_context():
+        resultado = runner.invoke(args=['db-init'])
+
+    assert resultado.exit_code == 0, resultado.output
+    assert 'Banco atualizado.' in resultado.output
+    with app.app_context():
+        assert 'agendamento' in inspect(db.engine).get_table_names()
+
+    # banco antigo: coluna nova aplicada por uma segunda execução
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(text('ALTER TABLE usuario DROP COLUMN versao_vitrine'))
+
+    with app.app_context():
+        assert runner.invoke(args=['db-init']).exit_code == 0
+        colunas = {c['name'] for c in inspect(db.engine).get_columns('usuario')}
+        assert 'versao_vitrine' in colunas
+
+
+def test_boot_nao_importa_ferramentas_de_schema():
+    # processo novo: os testes já importaram os módulos neste
+    resultado = subprocess.run([
+        sys.executable, '-c',
+        'import sys\n'
+        'from app import create_app\n'
+        'create_app()\n'
+        'print("app.migracoes" in sys.modules)',
+    ], cwd=RAIZ, capture_output=True, text=True, check=True)
+
+    assert resultado.stdout.strip() == 'False'
@@ -0,0 +1,78 @@
+import gzip
+import json
+
+import pytest
+
+from conftest import DIA
+
+# 62 dias de horários: bem acima de COMPRESSAO_MIN_BYTES
+PERIODO = '?de=2030-01-01&ate=2030-03-03'
+
+
+def _disponibilidade(client, agenda, aceita=None):
+    headers = {'Accept-Encoding': aceita} if aceita else {}
+    return client.get(f"/disponibilidade/{agenda['curto']}{PERIODO}", headers=headers)
+
+
+def test_sem_accept_encoding_nao_comprime(client, agenda):
+    resposta = _disponibilidade(client, agenda)
+
+    assert 'Content-Encoding' not in resposta.headers
+    assert 'Accept-Encoding' in resposta.headers['Vary']
+    assert json.loads(resposta.data)
+
+
+def test_gzip(client, agenda):
+    original = _disponibilidade(client, agenda).data
+    resposta = _disponibilidade(client, agenda, 'gzip')
+
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert len(resposta.data) < len(original)
+    assert gzip.decompress(resposta.data) == original
+
+
+def test_brotli_pela_preferencia_do_navegador(client, agenda):
+    brotli = pytest.importorskip('brotli')
+    original = _disponibilidade(client, agenda).data
+
+    resposta = _disponibilidade(client, agenda, 'gzip, deflate, br')
+    assert resposta.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(resposta.data) == original
+
+    # qualidade maior no gzip: vale a do navegador, não a nossa ordem
+    resposta = _disponibilidade(client, agenda, 'br;q=0.5, gzip')
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+
+
+def test_codificacao_desconhecida_nao_comprime(client, agenda):
+    resposta = _disponibilidade(client, agenda, 'deflate')
+    assert 'Content-Encoding' not in resposta.headers
+
+
+def test_resposta_pequena_passa_direto(client, agenda):
+    resposta = client.post('/verificar_horarios', json={
+        'data': DIA.isoformat(), 'servico_id': agenda['curto'],
+    }, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in resposta.headers
+    assert resposta.json == ['08:00', '09:00', '10:00', '11:00']
+
+
+def test_exportacao_em_fluxo_passa_direto(logado):
+    resposta = logado.get(
+        '/exportar/agendamentos?formato=ndjson', headers={'Accept-Encoding': 'gzip'}
+    )
+    assert 'Content-Encoding' not in resposta.headers
+
+
+def test_vitrine_comprimida_revalida_pelo_etag_fraco(client, agenda):
+    resposta = client.get('/agenda/ana', headers={'Accept-Encoding': 'gzip'})
+    etag = resposta.headers['ETag']
+
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert etag.startswith('W/')
+
+    revalidada = client.get('/agenda/ana', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': etag,
+    })
+    assert revalidada.status_code == 304
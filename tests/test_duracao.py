@@ -0,0 +1,31 @@
+from app.disponibilidade import inicios_livres, intervalo, mascara_ocupada
+
+from conftest import agendar
+
+SLOTS = [480, 540, 600, 660]
+
+
+def test_intervalo_limita_ao_dia():
+    assert intervalo(0, 3) == 0b111
+    assert intervalo(1439, 60) == 1 << 1439
+    assert intervalo(600, 0) == 0
+
+
+def test_inicios_livres_respeita_duracao_e_bloqueios():
+    agendado = mascara_ocupada([(540, 90)], passo=60)
+
+    assert inicios_livres(SLOTS, 60, set(), agendado, 60) == [480, 660]
+    assert inicios_livres(SLOTS, 60, {480}, agendado, 60) == [660]
+    # 120 min às 11:00 sai do expediente
+    assert inicios_livres(SLOTS, 60, set(), 0, 120) == [480, 540, 600]
+
+
+def test_agendamento_antigo_sem_duracao_ocupa_um_passo():
+    assert mascara_ocupada([(540, None)], passo=60) == intervalo(540, 60)
+
+
+def test_servico_longo_bloqueia_horario_seguinte(client, agenda):
+    # 09:00-10:30 ocupa também o horário das 10:00
+    assert agendar(client, agenda['longo'], '09:00').status_code == 200
+    assert agendar(client, agenda['curto'], '10:00').status_code == 409
+    assert agendar(client, agenda['curto'], '11:00').status_code == 200
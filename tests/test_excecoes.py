@@ -0,0 +1,75 @@
+from datetime import date
+
+import pytest
+
+from app.disponibilidade import expandir_excecoes
+from app.models import ExcecaoAgenda
+
+CONFIG = {'dias_semana': [0, 1, 2, 3, 4], 'horarios_base': ['08:00', '09:00']}
+
+
+def _salvar(client, excecoes):
+    return client.post('/salvar_configuracao_agenda', json={**CONFIG, 'excecoes': excecoes})
+
+
+def test_periodo_e_regra_semanal(app, logado):
+    resposta = _salvar(logado, [
+        {'de': '2030-01-07', 'ate': '2030-01-20', 'dias_semana': [5, 6], 'dia_ativo': False},
+        {'data': '2030-01-08', 'horarios': ['09:00']},
+    ])
+    assert resposta.status_code == 200
+
+    with app.app_context():
+        excecoes = {
+            ex.data: (ex.dia_ativo, ex.horarios_bloqueados)
+            for ex in ExcecaoAgenda.query
+        }
+
+    assert excecoes == {
+        date(2030, 1, 12): (False, []),
+        date(2030, 1, 13): (False, []),
+        date(2030, 1, 19): (False, []),
+        date(2030, 1, 20): (False, []),
+        date(2030, 1, 8): (True, [540]),
+    }
+
+
+def test_reenvio_atualiza_em_vez_de_duplicar(app, logado):
+    _salvar(logado, [{'data': '2030-01-08', 'dia_ativo': False}])
+    _salvar(logado, [{'de': '2030-01-08', 'ate': '2030-01-09', 'horarios': ['08:00']}])
+
+    with app.app_context():
+        excecoes = ExcecaoAgenda.query.order_by(ExcecaoAgenda.data).all()
+        assert [(ex.data.day, ex.dia_ativo, ex.horarios_bloqueados) for ex in excecoes] == [
+            (8, True, [480]), (9, True, [480])
+        ]
+
+
+def test_itens_posteriores_sobrescrevem():
+    por_data = expandir_excecoes([
+        {'de': '2030-01-07', 'ate': '2030-01-09', 'dia_ativo': False},
+        {'data': '2030-01-08'},
+    ])
+
+    assert por_data[date(2030, 1, 8)] == (True, [])
+    assert por_data[date(2030, 1, 9)] == (False, [])
+
+
+@pytest.mark.parametrize('excecoes', [
+    {'data': '2030-01-08'},
+    'nada',
+    ['2030-01-08'],
+    [None],
+    [{'de': '2030-01-08'}],
+    [{'data': 20300108}],
+    [{'data': '2030-01-08', 'dia_ativo': 'nao'}],
+    [{'data': '2030-01-08', 'horarios': 9}],
+    [{'de': '2030-01-08', 'ate': '2030-01-20', 'dias_semana': 5}],
+    [{'de': '2030-01-20', 'ate': '2030-01-08'}],
+    [{'de': '2030-01-01', 'ate': '2031-12-31'}],
+])
+def test_formato_invalido_retorna_400(app, logado, excecoes):
+    assert _salvar(logado, excecoes).status_code == 400
+
+    with app.app_context():
+        assert ExcecaoAgenda.query.count() == 0
@@ -0,0 +1,45 @@
+import pytest
+
+from app.disponibilidade import normalizar_dias, normalizar_horarios
+from app.migracoes import _horarios_em_minutos
+from app.models import db, ConfiguracaoAgenda
+
+from conftest import DIA
+
+
+def test_formatos_antigos_normalizados():
+    assert normalizar_horarios('09:30,08:00') == [480, 570]
+    assert normalizar_horarios(['08:00', 540, '08:00']) == [480, 540]
+    assert normalizar_dias('4,0,2') == [0, 2, 4]
+
+    with pytest.raises(ValueError):
+        normalizar_horarios(['25:00'])
+
+
+def test_horarios_antigos_viram_minutos(app, agenda):
+    with app.app_context():
+        config = ConfiguracaoAgenda.query.one()
+        config.dias_semana = '0,1,2'
+        config.horarios_base = '08:00,09:30'
+        db.session.commit()
+
+        with db.engine.begin() as conn:
+            _horarios_em_minutos(conn)
+
+        db.session.expire_all()
+        config = ConfiguracaoAgenda.query.one()
+        assert config.dias_semana == [0, 1, 2]
+        assert config.horarios_base == [480, 570]
+
+
+def test_horarios_disponiveis_valida_entrada(client, agenda):
+    def consultar(**dados):
+        return client.post('/horarios_disponiveis', json=dados)
+
+    assert consultar(data=DIA.isoformat()).status_code == 400
+    assert consultar(data=DIA.isoformat(), usuario_id='abc').status_code == 400
+    assert consultar(data='08/01/2030', usuario_id=agenda['usuario']).status_code == 400
+
+    resposta = consultar(data=DIA.isoformat(), usuario_id=str(agenda['usuario']))
+    assert resposta.status_code == 200
+    assert resposta.get_json() == ['08:00', '09:00', '10:00', '11:00']
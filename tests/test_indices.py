@@ -0,0 +1,49 @@
+from datetime import time
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from app.migracoes import atualizar_schema
+from app.models import db, Agendamento
+
+from conftest import DIA
+
+
+def _agendamento(usuario_id, horario):
+    return Agendamento(
+        usuario_id=usuario_id, nome='Cliente', telefone='11988887777',
+        data=DIA, horario=horario, duracao_minutos=60
+    )
+
+
+def test_indice_unico_barra_horario_repetido(app, agenda):
+    with app.app_context():
+        db.session.add(_agendamento(agenda['usuario'], time(9)))
+        db.session.commit()
+
+        db.session.add(_agendamento(agenda['usuario'], time(9)))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+
+        db.session.add(_agendamento(agenda['usuario'], time(10)))
+        db.session.commit()
+        assert Agendamento.query.count() == 2
+
+
+def test_banco_existente_recebe_os_indices(app):
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text('DROP INDEX uq_agendamento_usuario_data_horario'))
+
+        atualizar_schema(db)
+
+        indices = {
+            indice['name']: indice
+            for indice in inspect(db.engine).get_indexes('agendamento')
+        }
+        assert indices['uq_agendamento_usuario_data_horario']['unique']
+        assert indices['uq_agendamento_usuario_data_horario']['column_names'] == [
+            'usuario_id', 'data', 'horario'
+        ]
@@ -0,0 +1,28 @@
+import pytest
+
+from app import auth
+
+
+@pytest.fixture
+def limite_baixo(monkeypatch):
+    monkeypatch.setattr(auth.limite_login, 'capacidade', 2)
+    monkeypatch.setattr(auth.limite_login, 'reposicao', 0)
+
+
+def _login(client, usuario, ip):
+    return client.post(
+        '/login',
+        data={'username': usuario, 'password': 'errada'},
+        headers={'X-Forwarded-For': ip}
+    ).status_code
+
+
+def test_limite_por_ip_do_cliente_atras_do_proxy(client, limite_baixo):
+    # cada cliente tem o seu balde, mesmo vindo todos do mesmo proxy
+    assert [_login(client, f'u{i}', '203.0.113.1') for i in range(3)] == [200, 200, 429]
+    assert _login(client, 'outro', '203.0.113.2') == 200
+
+
+def test_limite_por_usuario(client, limite_baixo):
+    ips = ['203.0.113.1', '203.0.113.2', '203.0.113.3']
+    assert [_login(client, 'ana', ip) for ip in ips] == [200, 200, 429]
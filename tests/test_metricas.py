@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from app import create_app
+from app.metricas import Metricas
+from app.models import db
+from config import Config
+
+
+@pytest.fixture
+def app_metricas(monkeypatch):
+    monkeypatch.setattr(Config, 'METRICS_ENABLED', True)
+    app = create_app()
+    app.config['TESTING'] = True
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_histograma_acumula_por_bucket():
+    metricas = Metricas()
+    metricas.registrar('main.painel', 0.003, 2, 0.001)
+    metricas.registrar('main.painel', 0.2, 5, 0.1)
+
+    texto = metricas.texto_prometheus()
+
+    assert 'http_request_duration_seconds_bucket{endpoint="main.painel",le="0.005"} 1' in texto
+    assert 'http_request_duration_seconds_bucket{endpoint="main.painel",le="0.25"} 2' in texto
+    assert 'http_request_duration_seconds_bucket{endpoint="main.painel",le="+Inf"} 2' in texto
+    assert 'http_request_duration_seconds_count{endpoint="main.painel"} 2' in texto
+    assert 'db_queries_total{endpoint="main.painel"} 7' in texto
+
+
+def test_server_timing_e_contagem_de_queries(app_metricas, agenda):
+    cliente = app_metricas.test_client()
+
+    resposta = cliente.get('/agenda/ana')
+    timing = resposta.headers['Server-Timing']
+    consultas = int(re.search(r'desc="(\d+) queries"', timing).group(1))
+
+    assert timing.startswith('app;dur=')
+    assert consultas >= 1
+
+    texto = cliente.get('/metrics').data.decode()
+    assert f'db_queries_total{{endpoint="main.agenda_publica_slug"}} {consultas}' in texto
+    assert 'http_request_duration_seconds_count{endpoint="main.agenda_publica_slug"} 1' in texto
+
+
+def test_desligado_nao_instala_nada(app, client):
+    assert 'metricas' not in app.extensions
+    assert client.get('/metrics').status_code == 404
+    assert 'Server-Timing' not in client.get('/login').headers
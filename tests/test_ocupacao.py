@@ -0,0 +1,71 @@
+from datetime import date
+
+from app.disponibilidade import de_bytes, mascara_ocupada, para_bytes, reconstruir_ocupacao
+from app.models import db, Agendamento, OcupacaoDia
+
+from conftest import DIA, agendar
+
+
+def test_bitmap_ida_e_volta_em_bytes():
+    mascara = mascara_ocupada([(540, 90), (1380, None)], passo=60)
+    dados = para_bytes(mascara)
+
+    assert len(dados) == 180
+    assert de_bytes(dados) == mascara
+    assert de_bytes(None) == 0
+
+
+def test_agendar_grava_e_atualiza_resumo(app, client, agenda):
+    resposta = agendar(client, agenda['curto'], '09:00')
+
+    assert resposta.status_code == 200
+    with app.app_context():
+        assert Agendamento.query.count() == 1
+        ocupacao = OcupacaoDia.query.one()
+        assert ocupacao.data == DIA
+        assert ocupacao.livres == 3
+
+
+def test_resumo_igual_a_reconstrucao(app, client, agenda):
+    agendar(client, agenda['longo'], '09:00')
+    agendar(client, agenda['curto'], '08:00', dia=date(2030, 1, 9))
+
+    with app.app_context():
+        incremental = {
+            (o.data, o.minutos_ocupados, o.livres) for o in OcupacaoDia.query
+        }
+        with db.engine.begin() as conn:
+            reconstruir_ocupacao(conn)
+        db.session.expire_all()
+        refeito = {
+            (o.data, o.minutos_ocupados, o.livres) for o in OcupacaoDia.query
+        }
+
+    assert incremental == refeito
+    assert len(refeito) == 2
+
+
+def test_resumo_divergente_nao_libera_horario(app, client, agenda):
+    assert agendar(client, agenda['longo'], '09:00').status_code == 200
+
+    # a conferência da gravação lê os agendamentos, não o resumo
+    with app.app_context():
+        OcupacaoDia.query.delete()
+        db.session.commit()
+
+    assert agendar(client, agenda['curto'], '10:00').status_code == 409
+    with app.app_context():
+        assert Agendamento.query.count() == 1
+
+
+def test_cancelar_libera_horario(app, client, agenda):
+    assert agendar(client, agenda['curto'], '09:00').status_code == 200
+    with app.app_context():
+        id_ = Agendamento.query.one().id
+
+    assert client.post(f'/cancelar/{id_}').status_code == 302
+
+    with app.app_context():
+        assert Agendamento.query.count() == 0
+        assert OcupacaoDia.query.count() == 0
+    assert agendar(client, agenda['curto'], '09:00').status_code == 200
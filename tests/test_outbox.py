@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+from app import outbox
+from app.models import db, EventoOutbox
+from config import Config
+
+from conftest import agendar
+
+
+def test_agendar_registra_evento_na_mesma_transacao(app, client, agenda):
+    assert agendar(client, agenda['curto'], '09:00').status_code == 200
+    # conflito: nada gravado, nenhum evento
+    assert agendar(client, agenda['curto'], '09:00').status_code == 409
+
+    with app.app_context():
+        evento = EventoOutbox.query.one()
+        assert evento.tipo == 'agendamento_criado'
+        assert evento.dados['horario'] == '09:00'
+        assert evento.processado_em is None
+
+
+def test_reserva_nao_entrega_o_mesmo_evento_duas_vezes(app):
+    with app.app_context():
+        for _ in range(3):
+            outbox.registrar_evento('teste')
+        db.session.commit()
+
+        primeiro = outbox.reservar_lote(2)
+        segundo = outbox.reservar_lote(2)
+
+        assert [e.tentativas for e in primeiro] == [1, 1]
+        assert len(segundo) == 1
+        assert not {e.id for e in primeiro} & {e.id for e in segundo}
+        assert outbox.reservar_lote(2) == []
+
+
+def test_falha_volta_com_espera_e_depois_processa(app, monkeypatch):
+    chamadas = []
+
+    def instavel(evento):
+        chamadas.append(evento.id)
+        if len(chamadas) == 1:
+            raise RuntimeError('fora do ar')
+
+    monkeypatch.setitem(outbox._tratadores, 'teste', [instavel])
+
+    with app.app_context():
+        outbox.registrar_evento('teste')
+        db.session.commit()
+
+        assert outbox.processar_lote() == (0, 1)
+        evento = EventoOutbox.query.one()
+        assert evento.ultimo_erro == 'RuntimeError: fora do ar'
+        assert evento.disponivel_em > datetime.utcnow() + timedelta(
+            seconds=Config.OUTBOX_BACKOFF - 1
+        )
+
+        # ainda na espera: o worker não pega
+        assert outbox.processar_lote() == (0, 0)
+
+        evento.disponivel_em = datetime.utcnow()
+        db.session.commit()
+
+        assert outbox.processar_lote() == (1, 0)
+        evento = EventoOutbox.query.one()
+        assert evento.tentativas == 2
+        assert evento.processado_em is not None
+        assert evento.ultimo_erro is None
+
+    assert len(chamadas) == 2
+
+
+def test_desiste_apos_max_tentativas(app, monkeypatch):
+    def falha(evento):
+        raise RuntimeError('sempre')
+
+    monkeypatch.setitem(outbox._tratadores, 'teste', [falha])
+    monkeypatch.setattr(Config, 'OUTBOX_MAX_TENTATIVAS', 2)
+
+    with app.app_context():
+        outbox.registrar_evento('teste')
+        db.session.commit()
+
+        for _ in range(2):
+            assert outbox.processar_lote() == (0, 1)
+            EventoOutbox.query.update({'disponivel_em': datetime.utcnow()})
+            db.session.commit()
+
+        # fica pendente, com o último erro, para inspeção
+        assert outbox.processar_lote() == (0, 0)
+        evento = EventoOutbox.query.one()
+        assert evento.tentativas == 2
+        assert evento.processado_em is None
+        assert evento.ultimo_erro == 'RuntimeError: sempre'
@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from app.disponibilidade import calcular_periodo
+
+from conftest import DIA, agendar
+
+SLOTS = [480, 540, 600, 660]
+
+
+def _agenda(excecoes=None):
+    return {
+        'configurada': True,
+        'dias': {0, 1, 2, 3, 4},
+        'slots': SLOTS,
+        'passo': 60,
+        'excecoes': excecoes or {},
+    }
+
+
+def test_calcular_periodo_com_excecoes():
+    sabado = DIA + timedelta(days=4)
+    quarta = DIA + timedelta(days=1)
+    agenda = _agenda({
+        quarta.isoformat(): {'ativo': False, 'bloqueados': []},
+        DIA.isoformat(): {'ativo': True, 'bloqueados': [480]},
+    })
+
+    periodo = calcular_periodo(agenda, {}, DIA, sabado, 60)
+
+    assert periodo[DIA] == ['09:00', '10:00', '11:00']
+    assert periodo[quarta] == []
+    assert periodo[sabado] == []
+    assert periodo[DIA + timedelta(days=2)] == ['08:00', '09:00', '10:00', '11:00']
+
+
+def test_rotas_de_disponibilidade(client, agenda):
+    agendar(client, agenda['longo'], '09:00')
+
+    mes = client.get(
+        f"/disponibilidade/{agenda['curto']}?de={DIA.isoformat()}&ate={DIA.isoformat()}"
+    ).json
+    assert mes['dias'][DIA.isoformat()] == ['08:00', '11:00']
+
+
+def test_periodo_invalido_retorna_400(client, agenda):
+    url = f"/disponibilidade/{agenda['curto']}"
+
+    assert client.get(f'{url}?de=2030-13-01').status_code == 400
+    assert client.get(f'{url}?de=2030-01-31&ate=2030-01-01').status_code == 400
@@ -0,0 +1,35 @@
+import json
+
+from app.relatorios import gerar_relatorio
+
+from conftest import DIA, agendar
+
+
+def test_relatorio_cabe_no_cache_compartilhado(app, client, agenda):
+    agendar(client, agenda['curto'], '08:00')
+
+    with app.app_context():
+        relatorio = gerar_relatorio(agenda['usuario'], DIA.year)
+
+    # CacheRedis guarda JSON: o valor precisa voltar igual
+    assert json.loads(json.dumps(relatorio)) == relatorio
+    assert relatorio['receita_no_ano'] == 50
+
+
+def test_agendamento_invalida_relatorio(app, client, agenda):
+    with app.app_context():
+        assert gerar_relatorio(agenda['usuario'], DIA.year)['total_no_ano'] == 0
+
+    assert agendar(client, agenda['curto'], '08:00').status_code == 200
+
+    with app.app_context():
+        relatorio = gerar_relatorio(agenda['usuario'], DIA.year)
+
+    assert relatorio['total_no_ano'] == 1
+    assert relatorio['por_mes'][DIA.month - 1]['receita'] == 50
+
+
+def test_ano_fora_da_faixa_retorna_400(logado):
+    for ano in (0, 9999, 99999):
+        assert logado.get(f'/relatorio?ano={ano}').status_code == 400
+    assert logado.get('/relatorio?ano=2030').status_code == 200
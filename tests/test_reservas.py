@@ -0,0 +1,76 @@
+import re
+
+from app.models import ReservaHorario
+from config import Config
+
+from conftest import DIA, agendar
+
+
+def _confirmar(client, servico_id, hora):
+    return client.post('/confirmar_agendamento', data={
+        'servico_id': servico_id,
+        'data': DIA.isoformat(),
+        'hora': hora,
+    })
+
+
+def _livres(client, servico_id):
+    return client.post('/verificar_horarios', json={
+        'data': DIA.isoformat(),
+        'servico_id': servico_id,
+    }).json
+
+
+def _token(resposta):
+    return re.search(rb'name="reserva" value="([^"]+)"', resposta.data).group(1).decode()
+
+
+def test_reserva_esconde_horario_dos_outros(app, agenda):
+    cliente_a, cliente_b = app.test_client(), app.test_client()
+
+    assert _confirmar(cliente_a, agenda['curto'], '09:00').status_code == 200
+
+    assert '09:00' not in _livres(cliente_b, agenda['curto'])
+    assert _confirmar(cliente_b, agenda['curto'], '09:00').status_code == 409
+    assert agendar(cliente_b, agenda['curto'], '09:00').status_code == 409
+
+
+def test_dono_da_reserva_agenda_e_consome(app, agenda):
+    cliente = app.test_client()
+    token = _token(_confirmar(cliente, agenda['curto'], '09:00'))
+
+    assert agendar(cliente, agenda['curto'], '09:00', reserva=token).status_code == 200
+    with app.app_context():
+        assert ReservaHorario.query.count() == 0
+
+
+def test_nova_confirmacao_substitui_a_reserva_anterior(app, agenda):
+    cliente_a, cliente_b = app.test_client(), app.test_client()
+
+    _confirmar(cliente_a, agenda['curto'], '09:00')
+    _confirmar(cliente_a, agenda['curto'], '10:00')
+
+    livres = _livres(cliente_b, agenda['curto'])
+    assert '09:00' in livres and '10:00' not in livres
+    with app.app_context():
+        assert ReservaHorario.query.count() == 1
+
+
+def test_reserva_vencida_nao_bloqueia(app, agenda, monkeypatch):
+    cliente_a, cliente_b = app.test_client(), app.test_client()
+    monkeypatch.setattr(Config, 'RESERVA_TTL', -1)
+
+    _confirmar(cliente_a, agenda['curto'], '09:00')
+
+    assert '09:00' in _livres(cliente_b, agenda['curto'])
+    assert agendar(cliente_b, agenda['curto'], '09:00').status_code == 200
+
+
+
+def test_dono_da_reserva_ainda_ve_o_horario(app, agenda):
+    dono, outro = app.test_client(), app.test_client()
+    _confirmar(dono, agenda['curto'], '09:00')
+
+    # voltar da tela de dados para trocar de horário não some com o dele
+    assert '09:00' in _livres(dono, agenda['curto'])
+    assert '09:00' not in _livres(outro, agenda['curto'])
@@ -0,0 +1,63 @@
+import pytest
+
+from app.models import db, Usuario
+
+# como aparecem em PASSWORD_HASH_METHOD: o werkzeug completa os
+# parâmetros omitidos ao gravar o hash
+METODOS = ['scrypt', 'scrypt:32768:8:1', 'pbkdf2:sha256', 'pbkdf2:sha256:1000']
+
+
+@pytest.fixture
+def metodo_configurado(app):
+    original = app.config['PASSWORD_HASH_METHOD']
+
+    def configurar(metodo):
+        app.config['PASSWORD_HASH_METHOD'] = metodo
+
+    yield configurar
+    app.config['PASSWORD_HASH_METHOD'] = original
+
+
+@pytest.mark.parametrize('metodo', METODOS)
+def test_sem_rehash_no_mesmo_metodo(app, metodo_configurado, metodo):
+    metodo_configurado(metodo)
+    with app.app_context():
+        usuario = Usuario(username='ana', slug='ana')
+        usuario.set_password('x')
+        assert not usuario.precisa_rehash()
+
+
+@pytest.mark.parametrize('metodo', METODOS)
+def test_rehash_quando_o_metodo_muda(app, metodo_configurado, metodo):
+    with app.app_context():
+        usuario = Usuario(username='ana', slug='ana')
+        usuario.set_password('x', 'pbkdf2:sha256:2000')
+
+        metodo_configurado(metodo)
+        assert usuario.precisa_rehash()
+
+
+def test_login_nao_refaz_hash_atual(app, client, agenda, metodo_configurado):
+    metodo_configurado('scrypt')
+    with app.app_context():
+        usuario = db.session.get(Usuario, agenda['usuario'])
+        usuario.set_password('x')
+        db.session.commit()
+        anterior = usuario.password_hash
+
+    resposta = client.post('/login', data={'username': 'ana', 'password': 'x'})
+    assert resposta.status_code == 302
+
+    with app.app_context():
+        assert db.session.get(Usuario, agenda['usuario']).password_hash == anterior
+
+
+def test_login_refaz_hash_de_metodo_antigo(app, client, agenda, metodo_configurado):
+    metodo_configurado('scrypt')
+
+    client.post('/login', data={'username': 'ana', 'password': 'x'})
+
+    with app.app_context():
+        usuario = db.session.get(Usuario, agenda['usuario'])
+        assert usuario.password_hash.startswith('scrypt:32768:8:1$')
+        assert not usuario.precisa_rehash()
@@ -0,0 +1,53 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+from app.models import Agendamento
+from app.routes import CONSULTA_LIMITE, _agendamentos_cliente
+from app.telefones import normalizar_telefone
+
+from conftest import agendar, criar_agendamentos
+
+
+@pytest.mark.parametrize('digitado', [
+    '(11) 98888-7777', '011 98888 7777', '+55 11 98888-7777',
+    '0055 11 988887777', '5511988887777',
+])
+def test_formas_digitadas_viram_a_mesma_chave(digitado):
+    assert normalizar_telefone(digitado) == '+5511988887777'
+
+
+def test_telefone_invalido_retorna_400(client, agenda):
+    resposta = agendar(client, agenda['curto'], '09:00', telefone='123')
+    assert resposta.status_code == 400
+
+
+def test_consulta_acha_o_agendamento_em_outro_formato(app, client, agenda):
+    agendar(client, agenda['curto'], '09:00', telefone='(11) 98888-7777')
+
+    with app.app_context():
+        assert Agendamento.query.one().telefone_normalizado == '+5511988887777'
+        assert len(_agendamentos_cliente('011 98888 7777')) == 1
+        assert len(_agendamentos_cliente('011 98888 7777', usuario_id=agenda['usuario'] + 1)) == 0
+
+
+def test_historico_longo_nao_esconde_os_proximos(app, agenda):
+    hoje = date.today()
+
+    with app.app_context():
+        criar_agendamentos(agenda['usuario'], [
+            hoje - timedelta(days=d) for d in range(1, CONSULTA_LIMITE + 1)
+        ])
+        criar_agendamentos(agenda['usuario'], [hoje + timedelta(days=7)], horarios=[time(9)])
+
+        agendamentos = _agendamentos_cliente('11988887777', historico=True)
+        proximos = _agendamentos_cliente('11988887777')
+
+    assert len(agendamentos) == CONSULTA_LIMITE
+    assert agendamentos[0].data == hoje + timedelta(days=7)
+    # passados do mais recente ao mais antigo
+    assert agendamentos[1].data == hoje - timedelta(days=1)
+    assert agendamentos[1:] == sorted(
+        agendamentos[1:], key=lambda ag: (ag.data, ag.horario), reverse=True
+    )
+    assert [ag.data for ag in proximos] == [hoje + timedelta(days=7)]
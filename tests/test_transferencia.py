@@ -0,0 +1,119 @@
+import io
+import json
+
+from conftest import DIA, agendar
+
+from app.disponibilidade import reconstruir_ocupacao
+from app.models import db, Agendamento, OcupacaoDia, Servico
+
+
+def _importar(client, tipo, conteudo):
+    return client.post(f'/importar/{tipo}', data={
+        'arquivo': (io.BytesIO(conteudo.encode()), 'dados.csv'),
+    }, content_type='multipart/form-data')
+
+
+def test_importar_servicos_com_conflito(logado, app):
+    resposta = _importar(logado, 'servicos', 'titulo,tempo,valor\nBarba,30,25\ncorte,60,50\n,10,1\n')
+
+    assert resposta.json['inseridos'] == 1
+    assert resposta.json['conflitos'] == 1
+    assert resposta.json['invalidos'] == 1
+    with app.app_context():
+        assert Servico.query.filter_by(titulo='Barba').one().duracao_minutos == 30
+
+
+def test_importar_agendamentos_e_exportar(logado, app):
+    csv = (
+        'data;horario;nome;telefone;servico\n'
+        '2030-01-08;09:00;Ana;11988887777;Corte\n'
+        '2030-01-08;09:00;Bia;11977776666;Corte\n'
+        '08/01/2030;10:00;Caio;11966665555;Longo\n'
+        '2030-13-01;10:00;Dani;11955554444;Corte\n'
+    )
+    resposta = _importar(logado, 'agendamentos', csv)
+
+    assert resposta.json['inseridos'] == 2
+    assert resposta.json['conflitos'] == 1
+    assert resposta.json['invalidos'] == 1
+    with app.app_context():
+        assert Agendamento.query.count() == 2
+
+    linhas = logado.get('/exportar/agendamentos?formato=ndjson').data.decode().splitlines()
+    registros = [json.loads(linha) for linha in linhas]
+
+    assert [(r['nome'], r['horario'], r['duracao_minutos']) for r in registros] == [
+        ('Ana', '09:00', 60), ('Caio', '10:00', 90)
+    ]
+
+
+def test_importar_agendamento_sobreposto_pela_duracao(logado, app, agenda):
+    agendar(logado, agenda['curto'], '09:00')
+
+    # 08:30 de 60 min invade o das 09:00; 08:00 de 60 min termina antes
+    csv = (
+        'data,horario,nome,telefone,duracao_minutos\n'
+        '2030-01-08,08:30,Bia,11977776666,60\n'
+        '2030-01-08,08:00,Caio,11966665555,60\n'
+        '2030-01-08,10:00,Dani,11955554444,90\n'
+        '2030-01-08,11:00,Edu,11944443333,60\n'
+    )
+    resposta = _importar(logado, 'agendamentos', csv)
+
+    assert resposta.json['inseridos'] == 2
+    assert resposta.json['conflitos'] == 2
+    assert [e['linha'] for e in resposta.json['erros']] == [2, 5]
+    with app.app_context():
+        assert sorted(
+            a.horario.strftime('%H:%M') for a in Agendamento.query
+        ) == ['08:00', '09:00', '10:00']
+
+
+def test_importar_historico_sem_conferir_sobreposicao(logado, app):
+    csv = (
+        'data,horario,nome,telefone,duracao_minutos\n'
+        '2020-01-07,08:30,Bia,11977776666,60\n'
+        '2020-01-07,09:00,Caio,11966665555,60\n'
+    )
+    resposta = _importar(logado, 'agendamentos', csv)
+
+    assert resposta.json['inseridos'] == 2
+    assert resposta.json['conflitos'] == 0
+
+
+def test_importar_agendamento_sem_duracao_valida(logado, app):
+    csv = (
+        'data,horario,nome,telefone,duracao_minutos\n'
+        '2030-01-08,08:00,Bia,11977776666,\n'
+        '2030-01-08,09:00,Caio,11966665555,0\n'
+        '2030-01-08,10:00,Dani,11955554444,-30\n'
+    )
+    resposta = _importar(logado, 'agendamentos', csv)
+
+    assert resposta.json['inseridos'] == 0
+    assert resposta.json['invalidos'] == 3
+    with app.app_context():
+        assert Agendamento.query.count() == 0
+
+
+def test_importar_agendamentos_atualiza_resumo(logado, app):
+    csv = (
+        'data,horario,nome,telefone,servico\n'
+        f'{DIA.isoformat()},08:00,Bia,11977776666,Longo\n'
+        '2030-01-09,10:00,Caio,11966665555,Corte\n'
+    )
+    assert _importar(logado, 'agendamentos', csv).json['inseridos'] == 2
+
+    with app.app_context():
+        incremental = {
+            (o.data, o.minutos_ocupados, o.livres) for o in OcupacaoDia.query
+        }
+        with db.engine.begin() as conn:
+            reconstruir_ocupacao(conn)
+        db.session.expire_all()
+        refeito = {
+            (o.data, o.minutos_ocupados, o.livres) for o in OcupacaoDia.query
+        }
+
+    assert incremental == refeito
+    assert len(refeito) == 2
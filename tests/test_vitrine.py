@@ -0,0 +1,39 @@
+from app.models import db, Usuario
+
+
+def test_etag_e_304(client, agenda):
+    resposta = client.get('/agenda/ana')
+    etag = resposta.headers['ETag']
+
+    assert resposta.status_code == 200
+    assert resposta.headers['Cache-Control'] == 'public, no-cache'
+
+    revalidada = client.get('/agenda/ana', headers={'If-None-Match': etag})
+    assert revalidada.status_code == 304
+    assert revalidada.data == b''
+    assert revalidada.headers['ETag'] == etag
+
+
+def test_alteracao_muda_versao_e_pagina(app, logado, agenda):
+    etag = logado.get('/agenda/ana').headers['ETag']
+
+    resposta = logado.post('/salvar_identidade', json={'nome_fantasia': 'Barbearia da Ana'})
+    assert resposta.status_code == 200
+
+    with app.app_context():
+        assert db.session.get(Usuario, agenda['usuario']).versao_vitrine == 1
+
+    nova = logado.get('/agenda/ana', headers={'If-None-Match': etag})
+    assert nova.status_code == 200
+    assert nova.headers['ETag'] != etag
+    assert b'Barbearia da Ana' in nova.data
+
+
+def test_novo_servico_aparece_na_vitrine(logado, agenda):
+    etag = logado.get('/agenda/ana').headers['ETag']
+
+    logado.post('/servicos', data={'titulo': 'Sobrancelha', 'valor': '20', 'tempo': '30'})
+
+    nova = logado.get('/agenda/ana', headers={'If-None-Match': etag})
+    assert nova.status_code == 200
+    assert b'Sobrancelha' in nova.data